@@ -0,0 +1,430 @@
+import asyncio
+import copy
+import logging
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import config, observability
+
+from .services import helius_service, current_prices, delay_sweep, pnl_engine, pnl_rollups, price_resolver, transaction_parser, wallet_store
+from .services.ledger import TradeLedger
+
+# The wallet analysis pipeline: sync swaps -> price new swaps -> fold P&L -> summarize.
+# `run_analysis` reports progress through an optional `emit(event)` callback, which
+# the streaming endpoint turns into NDJSON lines.
+
+log = logging.getLogger(__name__)
+
+LEDGER_CHUNK_SIZE = 500
+
+# Add 60 seconds to simulate copy-trading delay
+COPY_DELAY_SECONDS = 60
+
+def swap_price_lookups(swaps: list[transaction_parser.Swap], delay: int = COPY_DELAY_SECONDS) -> list[tuple[str, int]]:
+    """The (token, delayed timestamp) lookups needed to price both sides of each swap."""
+    lookups = []
+    for swap in swaps:
+        delayed_timestamp = swap.timestamp + delay
+        lookups.append((swap.from_token, delayed_timestamp))
+        lookups.append((swap.to_token, delayed_timestamp))
+    return lookups
+
+def swap_prices(price_map: dict, swaps: list[transaction_parser.Swap],
+                delay: int = COPY_DELAY_SECONDS) -> list[tuple[float, float]]:
+    return [
+        (
+            price_resolver.price_for(price_map, swap.from_token, swap.timestamp + delay),
+            price_resolver.price_for(price_map, swap.to_token, swap.timestamp + delay),
+        )
+        for swap in swaps
+    ]
+
+def fallback_swaps(fallback_keys: set, swaps: list[transaction_parser.Swap],
+                   delay: int = COPY_DELAY_SECONDS) -> set[str]:
+    """Signatures of the swaps with a side priced by the current-price fallback."""
+    return {
+        swap.signature
+        for swap in swaps
+        if (swap.from_token, price_resolver.to_minute(swap.timestamp + delay)) in fallback_keys
+        or (swap.to_token, price_resolver.to_minute(swap.timestamp + delay)) in fallback_keys
+    }
+
+async def get_prices_for_swaps(swaps: list[transaction_parser.Swap], on_progress=None, fallback: set | None = None):
+    """
+    Resolves the delayed prices for both sides of every swap in one batched pass.
+    If `fallback` is given, the signatures of swaps priced with the current-price
+    fallback are added to it.
+    """
+    fallback_keys = set()
+    price_map = await price_resolver.resolve_prices(
+        swap_price_lookups(swaps), on_progress=on_progress, fallback=fallback_keys
+    )
+    if fallback is not None:
+        fallback.update(fallback_swaps(fallback_keys, swaps))
+    return swap_prices(price_map, swaps)
+
+def fold_and_save(snapshot: pnl_engine.PnlSnapshot, new_swaps: list[transaction_parser.Swap],
+                  prices: list[tuple[float, float]], fallback: set[str], reset: bool):
+    """
+    Folds new swaps into the snapshot and persists the result; returns the new ledger rows.
+    The stored snapshot stops before the first swap priced with the current-price fallback
+    that is younger than PRICE_SETTLE_AGE, so that swap and the ones after it are folded
+    again (with candles, once they exist) by the next analysis. Their rows are stored as
+    provisional meanwhile, and `snapshot` itself is folded through every swap.
+    """
+    new_rows = TradeLedger()
+    cutoff = time.time() - config.PRICE_SETTLE_AGE
+    stored = _fold_settled(snapshot, snapshot, new_swaps, prices, fallback, cutoff, new_rows)
+    wallet_store.save_pnl_snapshot(stored, new_rows, reset=reset, fallback=fallback)
+    return new_rows
+
+def _fold_settled(snapshot: pnl_engine.PnlSnapshot, stored: pnl_engine.PnlSnapshot,
+                  swaps: list[transaction_parser.Swap], prices: list[tuple[float, float]],
+                  fallback: set[str], cutoff: float, ledger_rows: TradeLedger) -> pnl_engine.PnlSnapshot:
+    """
+    Folds swaps into `snapshot` and returns the snapshot to store: `snapshot` itself until
+    the first swap priced with a fallback younger than `cutoff`, a copy frozen there after.
+    """
+    if stored is snapshot:
+        settled = next(
+            (i for i, swap in enumerate(swaps) if swap.signature in fallback and swap.timestamp >= cutoff),
+            len(swaps),
+        )
+        pnl_engine.fold(snapshot, swaps[:settled], prices[:settled], ledger_rows)
+        if settled == len(swaps):
+            return snapshot
+        stored = copy.deepcopy(snapshot)
+        swaps, prices = swaps[settled:], prices[settled:]
+    pnl_engine.fold(snapshot, swaps, prices, ledger_rows)
+    return stored
+
+async def price_and_fold(snapshot: pnl_engine.PnlSnapshot, new_swaps: list[transaction_parser.Swap], reset: bool,
+                         on_progress=None, on_rows=None) -> TradeLedger:
+    """
+    get_prices_for_swaps followed by fold_and_save, in chronological chunks of
+    LEDGER_CHUNK_SIZE swaps. Every chunk is priced concurrently, and each one is folded
+    (its rows passed to `on_rows`) as soon as it and the chunks before it have prices.
+    The rows are persisted together once the last chunk is folded.
+    """
+    chunks = [new_swaps[i:i + LEDGER_CHUNK_SIZE] for i in range(0, len(new_swaps), LEDGER_CHUNK_SIZE)]
+    progress = [(0, 0)] * len(chunks)
+
+    def chunk_progress(index: int):
+        def report(resolved: int, total: int):
+            progress[index] = (resolved, total)
+            if on_progress:
+                on_progress(sum(r for r, _ in progress), sum(t for _, t in progress))
+        return report
+
+    fallback = set()
+    pricing = [
+        asyncio.ensure_future(get_prices_for_swaps(chunk, on_progress=chunk_progress(i), fallback=fallback))
+        for i, chunk in enumerate(chunks)
+    ]
+    new_rows = TradeLedger()
+    stored = snapshot
+    cutoff = time.time() - config.PRICE_SETTLE_AGE
+    try:
+        for chunk, task in zip(chunks, pricing):
+            with observability.stage("price"):
+                prices = await task
+            with observability.stage("compute"):
+                # get_prices_for_swaps has added this chunk's fallback signatures by now
+                chunk_rows = TradeLedger()
+                stored = _fold_settled(snapshot, stored, chunk, prices, fallback, cutoff, chunk_rows)
+                new_rows.extend(chunk_rows)
+            if on_rows:
+                on_rows(chunk_rows)
+    finally:
+        for task in pricing:
+            task.cancel()
+        await asyncio.gather(*pricing, return_exceptions=True)
+    with observability.stage("compute"):
+        wallet_store.save_pnl_snapshot(stored, new_rows, reset=reset, fallback=fallback)
+    return new_rows
+
+def validate_timestamp(timestamp):
+    """Validate and potentially fix timestamps"""
+    if timestamp <= 0:
+        return 0
+    
+    # Check if timestamp is in milliseconds (too large)
+    if timestamp > 2000000000:  # Year 2033
+        return timestamp // 1000
+    
+    # Check if timestamp is in the future (more than 1 day)
+    now_utc = datetime.utcnow().timestamp()
+    if timestamp > now_utc + 86400:  # More than 1 day in future
+        log.warning("Future timestamp detected: %s (current: %s)", timestamp, now_utc)
+        # Could be milliseconds, try dividing by 1000
+        if timestamp // 1000 < now_utc + 86400:
+            return timestamp // 1000
+    
+    return timestamp
+
+def _no_emit(event: dict):
+    pass
+
+def _emit_rows(emit, ledger):
+    rows = ledger.to_dicts()
+    for i in range(0, len(rows), LEDGER_CHUNK_SIZE):
+        emit({"event": "ledger", "rows": rows[i:i + LEDGER_CHUNK_SIZE]})
+
+async def run_analysis(wallet_address: str, rebuild: bool = False, emit=None, include_ledger: bool = True,
+                       stream_ledger: bool = False) -> dict:
+    """
+    Runs the full analysis of a wallet and returns the response body.
+
+    With `emit`, progress events are reported as the pipeline advances:
+      {"event": "progress", "stage": "fetch", "pages": n, "transactions": n}
+      {"event": "progress", "stage": "price", "resolved": n, "total": n}
+      {"event": "ledger", "rows": [...]}  (only with stream_ledger)
+    With `stream_ledger=True, include_ledger=False` the ledger is emitted in chunks
+    instead of being returned: first the rows already stored, then the new swaps' rows
+    chunk by chunk as their prices come in (see price_and_fold).
+    With both False only the summaries are produced; the ledger stays in the
+    wallet store (see GET /wallets/{address}/ledger).
+    """
+    emit = emit or _no_emit
+    fetched = {"pages": 0, "transactions": 0}
+
+    def on_page(count: int):
+        fetched["pages"] += 1
+        fetched["transactions"] += count
+        emit({"event": "progress", "stage": "fetch", **fetched})
+
+    swaps = await sync_wallet(wallet_address, on_page=on_page, max_age=_sync_max_age(wallet_address))
+
+    if not swaps:
+        return {"wallet_address": wallet_address, "pnl": {}, "chart_data": [], "trade_ledger": []}
+
+    snapshot, new_swaps, reset = load_pending(wallet_address, swaps, rebuild)
+
+    # Rows already in the stored ledger can go out before any pricing happens; provisional
+    # rows past the snapshot cursor are folded again below and go out with the new ones
+    if stream_ledger and not reset:
+        settled = wallet_store.LedgerQuery(through=(snapshot.last_timestamp, snapshot.last_signature))
+        for chunk in wallet_store.iter_ledger(wallet_address, LEDGER_CHUNK_SIZE, settled):
+            emit({"event": "ledger", "rows": chunk.to_dicts()})
+
+    def on_price_progress(resolved: int, total: int):
+        emit({"event": "progress", "stage": "price", "resolved": resolved, "total": total})
+
+    # Only swaps not yet folded into the persisted snapshot need prices
+    await price_and_fold(snapshot, new_swaps, reset, on_progress=on_price_progress,
+                         on_rows=(lambda rows: _emit_rows(emit, rows)) if stream_ledger else None)
+
+    positions = pnl_engine.open_positions(snapshot)
+    # Price all open positions in one batch
+    with observability.stage("price"):
+        prices_now = await current_prices.get_current_prices(list(positions))
+    with observability.stage("compute"):
+        return summarize(snapshot, prices_now, len(new_swaps), reset, include_ledger)
+
+async def run_delay_sweep(wallet_address: str, delays: list[int]) -> dict:
+    """
+    Compares the copy-trade P&L of a wallet across several copy delays.
+    All delayed lookups go through one resolve_prices call, so each token's
+    history is fetched as contiguous candle ranges covering every offset and the
+    extra delays cost few or no additional upstream calls. Nothing is persisted.
+    """
+    delays = sorted(set(delays))
+    swaps = await sync_wallet(wallet_address)
+    if not swaps:
+        return {"wallet_address": wallet_address, "swaps": 0, "price_lookups": 0, "delays": []}
+    # Same chronological order the P&L fold uses
+    swaps = pnl_engine.pending_swaps(pnl_engine.PnlSnapshot(wallet=wallet_address), swaps)[1]
+
+    lookups = [lookup for delay in delays for lookup in swap_price_lookups(swaps, delay)]
+    with observability.stage("price"):
+        price_map = await price_resolver.resolve_prices(lookups)
+    with observability.stage("compute"):
+        # (swaps, delays, from/to)
+        prices = np.array([swap_prices(price_map, swaps, d) for d in delays], dtype=np.float64).transpose(1, 0, 2)
+        trade_pnl, positions, position_realized = delay_sweep.fold_delays(swaps, prices)
+    with observability.stage("price"):
+        prices_now = await current_prices.get_current_prices(list(positions))
+    with observability.stage("compute"):
+        timestamps = np.fromiter((s.timestamp for s in swaps), dtype=np.int64, count=len(swaps))
+        table = delay_sweep.comparison_table(
+            delays, timestamps, trade_pnl, positions, position_realized,
+            prices_now, datetime.now(timezone.utc).timestamp(),
+        )
+    return {
+        "wallet_address": wallet_address,
+        "swaps": len(swaps),
+        "price_lookups": len(price_map),
+        "delays": table,
+    }
+
+async def warm_wallet(wallet_address: str) -> dict:
+    """
+    Brings a wallet's upstream data into the local stores and caches without building
+    a response: syncs its history, resolves the prices of swaps not yet folded into its
+    P&L snapshot and refreshes the current prices of its open positions. The snapshot
+    itself is left to the next /analyze, which then only folds and summarizes.
+    """
+    swaps = await sync_wallet(wallet_address)
+    if not swaps:
+        return {"swaps": 0, "new_swaps": 0, "positions": 0}
+    snapshot, new_swaps, _ = load_pending(wallet_address, swaps, rebuild=False)
+    with observability.stage("price"):
+        prices = await get_prices_for_swaps(new_swaps)
+    with observability.stage("compute"):
+        # Folded in memory only, to learn which positions /analyze will price
+        pnl_engine.fold(snapshot, new_swaps, prices)
+        positions = pnl_engine.open_positions(snapshot)
+    with observability.stage("price"):
+        # Kept until the next pass has refreshed them, plus the usual TTL
+        await current_prices.get_current_prices(
+            list(positions), keep_for=config.WARMUP_INTERVAL + config.CURRENT_PRICE_TTL
+        )
+    return {"swaps": len(swaps), "new_swaps": len(new_swaps), "positions": len(positions)}
+
+def _sync_max_age(wallet_address: str) -> float:
+    """Watched wallets are kept synced by the warm-up, so a recent sync is reused as is."""
+    if config.WARMUP_ENABLED and wallet_store.is_watched(wallet_address):
+        return config.WATCHLIST_SYNC_MAX_AGE
+    return 0
+
+async def sync_wallet(wallet_address: str, on_page=None, max_age: float = 0) -> list[transaction_parser.Swap]:
+    """Syncs a wallet's history and returns its swaps with validated timestamps."""
+    swaps = await helius_service.get_wallet_transactions(wallet_address, on_page=on_page, max_age=max_age)
+
+    # Validate and fix timestamps
+    for swap in swaps:
+        swap.timestamp = validate_timestamp(swap.timestamp)
+    return swaps
+
+def load_pending(wallet_address: str, swaps: list[transaction_parser.Swap], rebuild: bool):
+    """Returns (snapshot, swaps still to fold, whether the stored ledger is being replaced)."""
+    if rebuild:
+        snapshot = pnl_engine.PnlSnapshot(wallet=wallet_address)
+    else:
+        snapshot = wallet_store.load_pnl_snapshot(wallet_address)
+    snapshot, new_swaps, rebuilt = pnl_engine.pending_swaps(snapshot, swaps)
+    return snapshot, new_swaps, rebuild or rebuilt
+
+def summarize(snapshot: pnl_engine.PnlSnapshot, prices_now: dict[str, float | None], new_swaps: int,
+              reset: bool, include_ledger: bool = True) -> dict:
+    """Builds the response body from a folded snapshot and the current prices of its positions."""
+    wallet_address = snapshot.wallet
+    positions = pnl_engine.open_positions(snapshot)
+
+    # Calculate unrealized P&L for current positions
+    unrealized_pnl = 0.0
+    unpriced_positions = []
+
+    for token, position in positions.items():
+        current_price = prices_now.get(token)
+        if current_price is None:
+            # Price unavailable – leave the position out of unrealized P&L and report it
+            unpriced_positions.append(token)
+            continue
+        token_unrealized = (current_price - position["cost_basis"]) * position["amount"]
+        unrealized_pnl += token_unrealized
+
+    # Use UTC for all time calculations and handle edge cases
+    now_utc = datetime.now(timezone.utc)
+
+    # Window totals and the (downsampled) cumulative chart including unrealized P&L, from the rollups
+    pnl_summary = pnl_rollups.window_totals(wallet_address, now_utc.timestamp(), unrealized_pnl)
+    chart_data = pnl_rollups.chart(wallet_address, unrealized_pnl)
+
+    # Add debug info
+    debug_info = {
+        "total_trades": snapshot.swap_count,
+        "current_positions": positions,
+        "realized_pnl_positions": snapshot.realized_pnl,
+        "new_swaps": new_swaps,
+        "rebuilt": reset,
+        "unrealized_pnl": unrealized_pnl,
+        "current_prices": {token: prices_now.get(token) for token in positions},
+        "current_time_utc": now_utc.replace(tzinfo=None).isoformat(),
+    }
+
+    log.debug("Analysis debug info for %s: %s", wallet_address, debug_info)
+
+    result = {
+        "wallet_address": wallet_address,
+        "pnl": pnl_summary,
+        "chart_data": chart_data,
+        # Open positions whose current price could not be fetched (excluded from unrealized P&L)
+        "unpriced_positions": unpriced_positions,
+    }
+    if include_ledger:
+        # Kept columnar; expanded to rows only when the response is rendered
+        result["trade_ledger"] = wallet_store.load_ledger(wallet_address)
+    result["debug"] = debug_info
+    return result
+
+async def run_batch(wallet_addresses: list[str], rebuild: bool = False, concurrency: int | None = None) -> dict:
+    """
+    Analyzes a cohort of wallets together. Histories are synced concurrently (at most
+    `concurrency` at a time); then the union of every wallet's (token, minute) price
+    lookups is resolved once, as are the current prices of all open positions, so
+    wallets trading the same tokens share every upstream price call.
+
+    Returns per-wallet summaries (without ledgers), a leaderboard ranked by total
+    all-time P&L, and per-wallet errors.
+    """
+    wallet_addresses = list(dict.fromkeys(wallet_addresses))
+    semaphore = asyncio.Semaphore(concurrency or config.BATCH_SYNC_CONCURRENCY)
+    errors: dict[str, str] = {}
+
+    async def sync(wallet_address: str):
+        async with semaphore:
+            try:
+                return await sync_wallet(wallet_address)
+            except Exception as e:
+                log.warning("Batch sync failed for %s: %s", wallet_address, e)
+                errors[wallet_address] = str(e)
+                return None
+
+    synced = await asyncio.gather(*[sync(w) for w in wallet_addresses])
+
+    pending = {}
+    lookups = []
+    for wallet_address, swaps in zip(wallet_addresses, synced):
+        if swaps is None:
+            continue
+        snapshot, new_swaps, reset = load_pending(wallet_address, swaps, rebuild)
+        pending[wallet_address] = (snapshot, new_swaps, reset)
+        lookups.extend(swap_price_lookups(new_swaps))
+
+    log.info("Batch of %d wallets needs %d price lookups", len(pending), len(lookups))
+    fallback_keys = set()
+    with observability.stage("price"):
+        price_map = await price_resolver.resolve_prices(lookups, fallback=fallback_keys)
+
+    open_mints = set()
+    with observability.stage("compute"):
+        for wallet_address, (snapshot, new_swaps, reset) in pending.items():
+            prices = swap_prices(price_map, new_swaps)
+            fold_and_save(snapshot, new_swaps, prices, fallback_swaps(fallback_keys, new_swaps), reset)
+            open_mints.update(pnl_engine.open_positions(snapshot))
+    with observability.stage("price"):
+        prices_now = await current_prices.get_current_prices(list(open_mints))
+
+    results = {}
+    leaderboard = []
+    for wallet_address, (snapshot, new_swaps, reset) in pending.items():
+        with observability.stage("compute"):
+            result = summarize(snapshot, prices_now, len(new_swaps), reset, include_ledger=False)
+        result.pop("debug", None)
+        results[wallet_address] = result
+        all_time = result["pnl"]["all_time"]
+        leaderboard.append({
+            "wallet_address": wallet_address,
+            "realized": all_time["realized"],
+            "unrealized": all_time["unrealized"],
+            "total": all_time["realized"] + all_time["unrealized"],
+            "trades": snapshot.swap_count,
+        })
+    leaderboard.sort(key=lambda row: row["total"], reverse=True)
+    for rank, row in enumerate(leaderboard, start=1):
+        row["rank"] = rank
+
+    return {"results": results, "leaderboard": leaderboard, "errors": errors}
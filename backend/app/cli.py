@@ -0,0 +1,96 @@
+"""
+Command-line entry point for cohort analysis.
+
+    cd backend
+    python -m app.cli batch <wallet> [<wallet> ...]
+    python -m app.cli batch --file wallets.txt --concurrency 16 --json
+    python -m app.cli sweep <wallet> --delays 10,30,60,120,300
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from . import analysis, config, observability
+from .services import http_clients
+
+def _read_wallets(args) -> list[str]:
+    wallets = list(args.wallets)
+    if args.file:
+        with open(args.file) as f:
+            wallets.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return wallets
+
+def _print_leaderboard(batch: dict):
+    print(f"{'rank':>4}  {'wallet':<44}  {'realized':>14}  {'unrealized':>14}  {'total':>14}  {'trades':>6}")
+    for row in batch["leaderboard"]:
+        print(
+            f"{row['rank']:>4}  {row['wallet_address']:<44}  {row['realized']:>14.2f}  "
+            f"{row['unrealized']:>14.2f}  {row['total']:>14.2f}  {row['trades']:>6}"
+        )
+    for wallet, error in batch["errors"].items():
+        print(f"error  {wallet}: {error}", file=sys.stderr)
+
+def _print_sweep(sweep: dict):
+    print(f"{sweep['wallet_address']}: {sweep['swaps']} swaps, {sweep['price_lookups']} price lookups")
+    print(f"{'delay':>6}  {'7d':>14}  {'30d':>14}  {'90d':>14}  {'realized':>14}  {'unrealized':>14}  {'total':>14}")
+    for row in sweep["delays"]:
+        pnl = row["pnl"]
+        print(
+            f"{row['delay_seconds']:>5}s  {pnl['7d']['realized']:>14.2f}  {pnl['30d']['realized']:>14.2f}  "
+            f"{pnl['90d']['realized']:>14.2f}  {pnl['all_time']['realized']:>14.2f}  "
+            f"{pnl['all_time']['unrealized']:>14.2f}  {row['total']:>14.2f}"
+        )
+
+async def _run_sweep(args):
+    await http_clients.startup()
+    try:
+        return await analysis.run_delay_sweep(args.wallet, args.delays)
+    finally:
+        await http_clients.shutdown()
+
+async def _run_batch(args):
+    await http_clients.startup()
+    try:
+        return await analysis.run_batch(_read_wallets(args), rebuild=args.rebuild, concurrency=args.concurrency)
+    finally:
+        await http_clients.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Wallet Analyzer command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Analyze a cohort of wallets and print a leaderboard")
+    batch.add_argument("wallets", nargs="*", help="Wallet addresses")
+    batch.add_argument("--file", help="File with one wallet address per line")
+    batch.add_argument("--concurrency", type=int, help="Wallet histories synced in parallel")
+    batch.add_argument("--rebuild", action="store_true", help="Recompute P&L from the full history")
+    batch.add_argument("--json", action="store_true", help="Print the full result as JSON")
+
+    sweep = commands.add_parser("sweep", help="Compare copy-trade P&L across several copy delays")
+    sweep.add_argument("wallet", help="Wallet address")
+    sweep.add_argument(
+        "--delays", type=lambda value: [int(d) for d in value.split(",")],
+        default=config.SWEEP_DEFAULT_DELAYS, help="Comma-separated delays in seconds",
+    )
+    sweep.add_argument("--json", action="store_true", help="Print the full result as JSON")
+
+    args = parser.parse_args(argv)
+    observability.setup_logging()
+    if args.command == "batch":
+        if not args.wallets and not args.file:
+            parser.error("batch needs wallet addresses or --file")
+        result = asyncio.run(_run_batch(args))
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            _print_leaderboard(result)
+    elif args.command == "sweep":
+        result = asyncio.run(_run_sweep(args))
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            _print_sweep(result)
+
+if __name__ == "__main__":
+    main()
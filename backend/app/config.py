@@ -4,6 +4,16 @@ from dotenv import load_dotenv
 # Load environment variables from a .env file
 load_dotenv()
 
+# --- Upstream mode ---
+# live: call Helius/Birdeye; record: call them and save every response under
+# FIXTURES_DIR; replay: answer from FIXTURES_DIR only (no network, no API keys).
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").lower()
+if UPSTREAM_MODE not in ("live", "record", "replay"):
+    raise ValueError(f"UPSTREAM_MODE must be live, record or replay (got {UPSTREAM_MODE!r}).")
+FIXTURES_DIR = os.getenv(
+    "FIXTURES_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+)
+
 # --- Helius configuration ---
 # Preferred: specify full RPC URL in .env (HELIUS_RPC_URL).
 # Fallback: build public shared endpoint from HELIUS_API_KEY.
@@ -13,6 +23,11 @@ HELIUS_RPC_URL = os.getenv("HELIUS_RPC_URL")
 HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
 BIRDEYE_API_KEY = os.getenv("BIRDEYE_API_KEY")
 
+if UPSTREAM_MODE == "replay":
+    # Fixtures are keyed without credentials, so any placeholder will do
+    HELIUS_API_KEY = HELIUS_API_KEY or "replay"
+    BIRDEYE_API_KEY = BIRDEYE_API_KEY or "replay"
+
 if not HELIUS_RPC_URL:
     if not HELIUS_API_KEY:
         raise ValueError("Helius API key not found. Please set either HELIUS_RPC_URL or HELIUS_API_KEY in the .env file.")
@@ -20,4 +35,118 @@ if not HELIUS_RPC_URL:
     HELIUS_RPC_URL = f"https://rpc.helius.xyz/?api-key={HELIUS_API_KEY}"
 
 if not BIRDEYE_API_KEY:
-    raise ValueError("Birdeye API key not found. Please set the BIRDEYE_API_KEY environment variable.") 
\ No newline at end of file
+    raise ValueError("Birdeye API key not found. Please set the BIRDEYE_API_KEY environment variable.") 
+
+# --- Local storage ---
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+# --- Price cache ---
+# Historical (mint, minute) prices are persisted here and shared by all workers.
+PRICE_CACHE_PATH = os.getenv("PRICE_CACHE_PATH", os.path.join(DATA_DIR, "prices.sqlite3"))
+# Entries kept in the per-process LRU in front of the SQLite store
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "100000"))
+# How long a value from the current-price fallback stays valid (seconds)
+CURRENT_PRICE_TTL = int(os.getenv("CURRENT_PRICE_TTL", "60"))
+# A swap priced with the current-price fallback is folded again by later analyses
+# (in case its candle shows up) until it is this old (seconds); then the fallback is final
+PRICE_SETTLE_AGE = int(os.getenv("PRICE_SETTLE_AGE", "3600"))
+# Mints kept in the per-process current-price cache
+CURRENT_PRICE_CACHE_MAX_ENTRIES = int(os.getenv("CURRENT_PRICE_CACHE_MAX_ENTRIES", "10000"))
+
+# --- Mint registry ---
+# Per-mint pricing facts (stablecoins, mints without Birdeye data), shared by all workers
+MINT_REGISTRY_PATH = os.getenv("MINT_REGISTRY_PATH", os.path.join(DATA_DIR, "mints.sqlite3"))
+# A mint Birdeye had no price for (no candles, no current price) is not looked up again for this long (seconds)
+MINT_NO_PRICE_TTL = int(os.getenv("MINT_NO_PRICE_TTL", "86400"))
+# Seconds a process trusts its in-memory copy of the registry before re-reading SQLite,
+# so marks made by other workers are picked up
+MINT_REGISTRY_REFRESH = float(os.getenv("MINT_REGISTRY_REFRESH", "30"))
+
+# --- Upstream HTTP connection pools ---
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+# Cap on open connections to a single upstream host
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+# Seconds an idle keep-alive connection stays in the pool
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+# --- Upstream rate limits ---
+# Set these to your API plan. Requests beyond the rate wait for a token;
+# concurrency shrinks on 429s and grows back while calls succeed.
+BIRDEYE_RPS = float(os.getenv("BIRDEYE_RPS", "15"))
+BIRDEYE_BURST = int(os.getenv("BIRDEYE_BURST", "15"))
+BIRDEYE_MAX_CONCURRENCY = int(os.getenv("BIRDEYE_MAX_CONCURRENCY", "8"))
+HELIUS_RPS = float(os.getenv("HELIUS_RPS", "10"))
+HELIUS_BURST = int(os.getenv("HELIUS_BURST", "10"))
+HELIUS_MAX_CONCURRENCY = int(os.getenv("HELIUS_MAX_CONCURRENCY", "10"))
+
+# --- Wallet transaction store ---
+# Parsed swaps and sync cursors per wallet, so re-analysis only fetches new pages.
+WALLET_STORE_PATH = os.getenv("WALLET_STORE_PATH", os.path.join(DATA_DIR, "wallets.sqlite3"))
+# Maximum number of transactions ingested per wallet (0 = no limit)
+HELIUS_MAX_TRANSACTIONS = int(os.getenv("HELIUS_MAX_TRANSACTIONS", "10000"))
+# RPC fallback: signatures per JSON-RPC batch POST, and batches in flight at once.
+# A batch takes one rate-limit token per signature, so it saves round-trips but not
+# rate budget: N signatures cost about N / HELIUS_RPS seconds of limiter waits.
+HELIUS_RPC_BATCH_SIZE = int(os.getenv("HELIUS_RPC_BATCH_SIZE", "100"))
+HELIUS_RPC_CONCURRENCY = int(os.getenv("HELIUS_RPC_CONCURRENCY", "4"))
+# Newest signatures looked up through the RPC fallback in one sync (0 = no limit)
+HELIUS_RPC_FALLBACK_MAX = int(os.getenv("HELIUS_RPC_FALLBACK_MAX", "500"))
+
+# --- Background analysis jobs ---
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# A finished analysis is reused for new submissions of the same wallet for this long (seconds)
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "300"))
+# Finished jobs stay queryable by id for this long (seconds)
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+
+# --- Watchlist warm-up ---
+# A background task keeps watched wallets synced and their prices cached, so
+# /analyze for them starts warm. Addresses in WATCHLIST are watched at startup.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WATCHLIST = [a.strip() for a in os.getenv("WATCHLIST", "").split(",") if a.strip()]
+# Seconds between the starts of two warm-up passes over the watchlist
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", "60"))
+# Fraction of each upstream's rate limit and concurrency the warm-up may use
+WARMUP_RATE_SHARE = float(os.getenv("WARMUP_RATE_SHARE", "0.25"))
+if not 0 < WARMUP_RATE_SHARE <= 1:
+    raise ValueError(f"WARMUP_RATE_SHARE must be in (0, 1] (got {WARMUP_RATE_SHARE}).")
+# Watched wallets are warmed most-queried first; query counts decay with this half-life (seconds)
+WARMUP_QUERY_HALF_LIFE = float(os.getenv("WARMUP_QUERY_HALF_LIFE", "86400"))
+# /analyze of a watched wallet reuses a sync at most this old (seconds) instead of calling Helius
+WATCHLIST_SYNC_MAX_AGE = float(os.getenv("WATCHLIST_SYNC_MAX_AGE", "120"))
+
+# --- Copy-trade delay sweep ---
+# Delays (seconds) compared when a sweep request does not name any
+SWEEP_DEFAULT_DELAYS = [int(d) for d in os.getenv("SWEEP_DEFAULT_DELAYS", "10,30,60,120,300").split(",")]
+SWEEP_MAX_DELAYS = int(os.getenv("SWEEP_MAX_DELAYS", "20"))
+SWEEP_MAX_DELAY_SECONDS = int(os.getenv("SWEEP_MAX_DELAY_SECONDS", "3600"))
+
+# --- Multi-wallet batch analysis ---
+# Wallet histories synced concurrently by a batch
+BATCH_SYNC_CONCURRENCY = int(os.getenv("BATCH_SYNC_CONCURRENCY", "8"))
+BATCH_MAX_WALLETS = int(os.getenv("BATCH_MAX_WALLETS", "500"))
+
+# --- Transaction parsing ---
+# Batches with at least this many transactions are parsed in a worker pool
+PARSE_POOL_THRESHOLD = int(os.getenv("PARSE_POOL_THRESHOLD", "1000"))
+# Transactions per pool task
+PARSE_POOL_CHUNK_SIZE = int(os.getenv("PARSE_POOL_CHUNK_SIZE", "500"))
+# Pool size (0 = min(4, CPU count))
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", "0"))
+
+# --- Responses ---
+# Responses smaller than this (bytes) are sent uncompressed
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+
+# --- Observability ---
+# Level of the "app" loggers (DEBUG, INFO, WARNING, ...); format "text" or "json"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Emit OpenTelemetry spans for analysis stages (needs the opentelemetry packages)
+OTEL_TRACING_ENABLED = os.getenv("OTEL_TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# --- P&L charts ---
+# Most points a chart series may hold; longer series are downsampled with LTTB
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
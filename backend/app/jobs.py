@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from . import analysis, config, observability
+
+log = logging.getLogger(__name__)
+
+# In-process background job queue for wallet analyses.
+# - A fixed pool of worker tasks drains the queue, so a traffic spike queues up
+#   instead of opening hundreds of concurrent pipelines.
+# - Single-flight per wallet: submitting a wallet that is already queued or
+#   running returns the existing job instead of starting a duplicate.
+# - Finished results are reused for JOB_RESULT_TTL seconds.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+@dataclass
+class Job:
+    id: str
+    wallet_address: str
+    rebuild: bool = False
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict | None = None
+    error: str | None = None
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        body = {
+            "job_id": self.id,
+            "wallet_address": self.wallet_address,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            body["error"] = self.error
+        if include_result and self.status == DONE:
+            body["result"] = self.result
+        return body
+
+class JobQueue:
+    def __init__(self, workers: int, result_ttl: float, retention: float):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.retention = retention
+        self._jobs: dict[str, Job] = {}
+        # wallet -> newest job for that wallet (in flight or finished)
+        self._by_wallet: dict[str, Job] = {}
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"analysis-worker-{i}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def _is_fresh(self, job: Job) -> bool:
+        return job.status == DONE and job.finished_at is not None and time.time() - job.finished_at < self.result_ttl
+
+    def submit(self, wallet_address: str, rebuild: bool = False) -> Job:
+        self._prune()
+        current = self._by_wallet.get(wallet_address)
+        if current is not None:
+            if current.status in (QUEUED, RUNNING):
+                return current
+            if not rebuild and self._is_fresh(current):
+                return current
+
+        job = Job(id=uuid.uuid4().hex, wallet_address=wallet_address, rebuild=rebuild)
+        self._jobs[job.id] = job
+        self._by_wallet[wallet_address] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._by_wallet.get(job.wallet_address) is job:
+                    del self._by_wallet[job.wallet_address]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                with observability.request_timings() as timings:
+                    job.result = await analysis.run_analysis(job.wallet_address, rebuild=job.rebuild)
+                job.status = DONE
+                log.info(
+                    "Analysis job %s for %s done", job.id, job.wallet_address,
+                    extra=observability.stage_fields(timings),
+                )
+            except Exception as e:
+                log.exception("Analysis job %s for %s failed", job.id, job.wallet_address)
+                job.error = str(e)
+                job.status = FAILED
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+queue = JobQueue(
+    workers=config.JOB_WORKERS,
+    result_ttl=config.JOB_RESULT_TTL,
+    retention=config.JOB_RETENTION,
+)
@@ -1,14 +1,35 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 import asyncio
-from datetime import datetime, timedelta
-from collections import defaultdict
+import logging
+import time
+from contextlib import asynccontextmanager
 
-from .services import helius_service, birdeye_service, transaction_parser
-from . import config
+from .services import http_clients, parse_pool, pnl_rollups, price_cache, wallet_store
+from . import analysis, config, jobs, observability, responses, warmup
 
-app = FastAPI()
+observability.setup_logging()
+log = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled upstream clients live for the whole app, not per request
+    await http_clients.startup()
+    price_cache.purge_expired()
+    await jobs.queue.start()
+    if config.WARMUP_ENABLED:
+        await warmup.scheduler.start()
+    try:
+        yield
+    finally:
+        await warmup.scheduler.stop()
+        await jobs.queue.stop()
+        await http_clients.shutdown()
+        parse_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=responses.ORJSONResponse)
 
 # CORS (Cross-Origin Resource Sharing) middleware
 # This allows the frontend (running on a different port) to communicate with the backend.
@@ -27,193 +48,252 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Brotli/gzip for large JSON and MessagePack bodies; the NDJSON stream is left
+# uncompressed so progress events are not held back by compressor buffering.
+app.add_middleware(
+    responses.CompressionMiddleware,
+    minimum_size=config.RESPONSE_COMPRESSION_MIN_SIZE,
+    exclude_paths=("/analyze/stream",),
+)
+
+@app.middleware("http")
+async def time_stages(request: Request, call_next):
+    """Reports the pipeline stage timings of each request as a Server-Timing header and a log line."""
+    start = time.perf_counter()
+    with observability.request_timings() as timings:
+        response = await call_next(request)
+    if timings:
+        response.headers["Server-Timing"] = observability.server_timing(timings)
+        log.info(
+            "%s %s %d in %.3fs", request.method, request.url.path, response.status_code,
+            time.perf_counter() - start, extra=observability.stage_fields(timings),
+        )
+    return response
+
 class WalletAnalysisRequest(BaseModel):
     wallet_address: str
+    # Ignore the persisted P&L snapshot and recompute from the full history
+    rebuild: bool = False
+    # Send only summaries; page through the ledger with GET /wallets/{address}/ledger
+    include_ledger: bool = True
+
+class BatchAnalysisRequest(BaseModel):
+    wallet_addresses: list[str]
+    rebuild: bool = False
+
+class DelaySweepRequest(BaseModel):
+    wallet_address: str
+    # Copy delays (seconds) to compare
+    delays: list[int] = Field(default_factory=lambda: list(config.SWEEP_DEFAULT_DELAYS), min_length=1)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Wallet Analyzer API"}
 
-async def get_price_for_swap(swap: transaction_parser.Swap):
-    """Helper to get prices for both sides of a swap."""
-    # Add 60 seconds to simulate copy-trading delay
-    delayed_timestamp = swap.timestamp + 60
-    from_price, to_price = await asyncio.gather(
-        birdeye_service.get_token_price_at_time(swap.from_token, delayed_timestamp),
-        birdeye_service.get_token_price_at_time(swap.to_token, delayed_timestamp)
-    )
-    return from_price, to_price
-
-def validate_timestamp(timestamp):
-    """Validate and potentially fix timestamps"""
-    if timestamp <= 0:
-        return 0
-    
-    # Check if timestamp is in milliseconds (too large)
-    if timestamp > 2000000000:  # Year 2033
-        return timestamp // 1000
-    
-    # Check if timestamp is in the future (more than 1 day)
-    now_utc = datetime.utcnow().timestamp()
-    if timestamp > now_utc + 86400:  # More than 1 day in future
-        print(f"Warning: Future timestamp detected: {timestamp} (current: {now_utc})")
-        # Could be milliseconds, try dividing by 1000
-        if timestamp // 1000 < now_utc + 86400:
-            return timestamp // 1000
-    
-    return timestamp
-
-async def get_current_price(token_address):
-    """Get current price for unrealized P&L calculation"""
-    try:
-        current_timestamp = int(datetime.utcnow().timestamp())
-        return await birdeye_service.get_token_price_at_time(token_address, current_timestamp)
-    except:
-        # Fallback to mock price if API fails
-        mock_prices = {
-            "So11111111111111111111111111111111111111112": 140.50,  # SOL
-            "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyB7uHod": 1.00,  # USDC
-        }
-        return mock_prices.get(token_address, 0)
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: upstream calls/latency/429s/retries, price cache hits and stage timings."""
+    body, content_type = observability.metrics_response()
+    return Response(body, media_type=content_type)
 
 @app.post("/analyze")
-async def analyze_wallet(request: WalletAnalysisRequest):
-    swaps = await helius_service.get_wallet_transactions(request.wallet_address)
-    
-    if not swaps:
-        return {"wallet_address": request.wallet_address, "pnl": {}, "chart_data": [], "trade_ledger": []}
-
-    # Validate and fix timestamps
-    for swap in swaps:
-        swap.timestamp = validate_timestamp(swap.timestamp)
-
-    price_tasks = [get_price_for_swap(swap) for swap in swaps]
-    prices = await asyncio.gather(*price_tasks)
-    
-    # Track positions for unrealized P&L
-    positions = defaultdict(lambda: {"amount": 0.0, "cost_basis": 0.0, "total_cost": 0.0})
-    trade_ledger = []
-    realized_pnl_by_trade = []
-    
-    for swap, (from_price, to_price) in zip(swaps, prices):
-        # Validate timestamp for display
-        display_timestamp = validate_timestamp(swap.timestamp)
-        
-        value_out = swap.from_amount * from_price
-        value_in = swap.to_amount * to_price
-        immediate_pnl = value_in - value_out  # This is the immediate arbitrage gain/loss
-        
-        # Update positions
-        # Selling from_token
-        if positions[swap.from_token]["amount"] > 0:
-            # Calculate realized P&L for the sold portion
-            avg_cost_basis = positions[swap.from_token]["cost_basis"]
-            realized_pnl = (from_price - avg_cost_basis) * swap.from_amount
-            realized_pnl_by_trade.append({
-                "timestamp": display_timestamp,
-                "realized_pnl": realized_pnl,
-                "token": swap.from_token
-            })
-            
-            # Update position
-            positions[swap.from_token]["amount"] -= swap.from_amount
-            if positions[swap.from_token]["amount"] <= 0:
-                positions[swap.from_token] = {"amount": 0.0, "cost_basis": 0.0, "total_cost": 0.0}
-        
-        # Buying to_token  
-        old_amount = positions[swap.to_token]["amount"]
-        old_total_cost = positions[swap.to_token]["total_cost"]
-        new_amount = old_amount + swap.to_amount
-        new_total_cost = old_total_cost + value_in
-        
-        positions[swap.to_token]["amount"] = new_amount
-        positions[swap.to_token]["total_cost"] = new_total_cost
-        positions[swap.to_token]["cost_basis"] = new_total_cost / new_amount if new_amount > 0 else 0
-
-        trade_ledger.append({
-            "timestamp": display_timestamp,
-            "type": "SWAP",
-            "from_token": swap.from_token,
-            "to_token": swap.to_token,
-            "from_amount": swap.from_amount,
-            "to_amount": swap.to_amount,
-            "from_price": from_price,
-            "to_price": to_price,
-            "profit_or_loss": immediate_pnl,
-            "price_after_60s": to_price  # Add the delayed price for frontend
-        })
-
-    # Calculate unrealized P&L for current positions
-    unrealized_pnl = 0.0
-    current_prices = {}
-    
-    for token, position in positions.items():
-        if position["amount"] > 0:
-            current_price = await get_current_price(token)
-            current_prices[token] = current_price
-            token_unrealized = (current_price - position["cost_basis"]) * position["amount"]
-            unrealized_pnl += token_unrealized
-
-    # Sort trades by time for accurate windowing
-    trade_ledger.sort(key=lambda x: x['timestamp'])
-
-    # Use UTC for all time calculations and handle edge cases
-    now_utc = datetime.utcnow()
-    
-    def in_time_window(timestamp, days):
-        try:
-            if timestamp <= 0:
-                return False
-            trade_time = datetime.utcfromtimestamp(timestamp)
-            cutoff_time = now_utc - timedelta(days=days)
-            return trade_time >= cutoff_time
-        except (ValueError, OSError):
-            return False
-
-    # Calculate realized P&L for time windows
-    pnl_7d = sum(t['profit_or_loss'] for t in trade_ledger if in_time_window(t['timestamp'], 7))
-    pnl_30d = sum(t['profit_or_loss'] for t in trade_ledger if in_time_window(t['timestamp'], 30))
-    pnl_90d = sum(t['profit_or_loss'] for t in trade_ledger if in_time_window(t['timestamp'], 90))
-    pnl_all_time = sum(t['profit_or_loss'] for t in trade_ledger)
-
-    # For unrealized, we only show current unrealized (not time-windowed, as positions are current)
-    pnl_summary = {
-        "7d": {"realized": pnl_7d, "unrealized": unrealized_pnl if any(in_time_window(t['timestamp'], 7) for t in trade_ledger) else 0},
-        "30d": {"realized": pnl_30d, "unrealized": unrealized_pnl if any(in_time_window(t['timestamp'], 30) for t in trade_ledger) else 0},
-        "90d": {"realized": pnl_90d, "unrealized": unrealized_pnl if any(in_time_window(t['timestamp'], 90) for t in trade_ledger) else 0},
-        "all_time": {"realized": pnl_all_time, "unrealized": unrealized_pnl},
-    }
-
-    # Prepare chart data (cumulative P&L including unrealized)
-    chart_data = []
-    cumulative_pnl = 0
-    for trade in trade_ledger:
-        cumulative_pnl += trade['profit_or_loss']
+async def analyze_wallet(request: WalletAnalysisRequest, http_request: Request):
+    """
+    Full analysis of one wallet. Send `Accept: application/x-msgpack` for a
+    MessagePack body with the ledger and chart as parallel arrays.
+    """
+    wallet_store.record_query(request.wallet_address)
+    result = await analysis.run_analysis(
+        request.wallet_address, rebuild=request.rebuild, include_ledger=request.include_ledger
+    )
+    return responses.render(http_request, result)
+
+@app.post("/analyze/batch")
+async def analyze_wallets_batch(request: BatchAnalysisRequest, http_request: Request):
+    """
+    Analyzes a cohort of wallets with shared price resolution and returns
+    per-wallet summaries plus a leaderboard.
+    """
+    if len(request.wallet_addresses) > config.BATCH_MAX_WALLETS:
+        raise HTTPException(status_code=400, detail=f"At most {config.BATCH_MAX_WALLETS} wallets per batch")
+    invalid = [address for address in request.wallet_addresses if not wallet_store.is_address(address)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Not Solana wallet addresses: {', '.join(invalid)}")
+    result = await analysis.run_batch(request.wallet_addresses, rebuild=request.rebuild)
+    return responses.render(http_request, result)
+
+@app.post("/analyze/sweep")
+async def analyze_delay_sweep(request: DelaySweepRequest, http_request: Request):
+    """
+    Copy-trade P&L of one wallet for several copy delays, priced in a single
+    pass, as a comparison table with one row per delay.
+    """
+    if len(set(request.delays)) > config.SWEEP_MAX_DELAYS:
+        raise HTTPException(status_code=400, detail=f"At most {config.SWEEP_MAX_DELAYS} delays per sweep")
+    if any(delay < 0 or delay > config.SWEEP_MAX_DELAY_SECONDS for delay in request.delays):
+        raise HTTPException(
+            status_code=400, detail=f"Delays must be between 0 and {config.SWEEP_MAX_DELAY_SECONDS} seconds"
+        )
+    wallet_store.record_query(request.wallet_address)
+    result = await analysis.run_delay_sweep(request.wallet_address, request.delays)
+    return responses.render(http_request, result)
+
+@app.post("/analyze/stream")
+async def analyze_wallet_stream(request: WalletAnalysisRequest):
+    """
+    Streaming variant of /analyze (NDJSON, one event per line):
+    a "start" event, "progress" events while fetching and pricing, "ledger"
+    events carrying chunks of trade rows (unless include_ledger is false), then
+    a final "summary" event with the P&L windows and chart (or an "error" event).
+    """
+    wallet_store.record_query(request.wallet_address)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        # Runs after the response has started, so its timings are logged rather than sent
+        with observability.request_timings() as timings:
+            try:
+                result = await analysis.run_analysis(
+                    request.wallet_address, rebuild=request.rebuild, emit=events.put_nowait,
+                    include_ledger=False, stream_ledger=request.include_ledger,
+                )
+                events.put_nowait({"event": "summary", **result})
+            except Exception as e:
+                log.exception("Streaming analysis failed for %s", request.wallet_address)
+                events.put_nowait({"event": "error", "detail": str(e)})
+            finally:
+                events.put_nowait(None)
+        log.info(
+            "Streamed analysis of %s", request.wallet_address,
+            extra=observability.stage_fields(timings),
+        )
+
+    async def lines():
+        yield responses.dumps({"event": "start", "wallet_address": request.wallet_address}) + b"\n"
+        task = asyncio.create_task(run())
         try:
-            trade_time = datetime.utcfromtimestamp(trade['timestamp'])
-            formatted_time = trade_time.strftime('%Y-%m-%d %H:%M')
-        except (ValueError, OSError):
-            formatted_time = "Invalid Date"
-            
-        chart_data.append({
-            "date": formatted_time,
-            "pnl": cumulative_pnl + unrealized_pnl  # Include unrealized in chart
-        })
-
-    # Add debug info
-    debug_info = {
-        "total_trades": len(trade_ledger),
-        "current_positions": {k: v for k, v in positions.items() if v["amount"] > 0},
-        "unrealized_pnl": unrealized_pnl,
-        "current_time_utc": now_utc.isoformat(),
-    }
-
-    print(f"Debug info: {debug_info}")
-
-    return {
-        "wallet_address": request.wallet_address,
-        "pnl": pnl_summary,
-        "chart_data": chart_data,
-        "trade_ledger": trade_ledger,
-        "debug": debug_info
-    } 
\ No newline at end of file
+            while (event := await events.get()) is not None:
+                yield responses.dumps(event) + b"\n"
+        finally:
+            # Client went away – stop working on its behalf
+            task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def submit_analysis_job(request: WalletAnalysisRequest):
+    """
+    Queues a wallet analysis and returns its job id right away. A wallet that is
+    already being analyzed (or was analyzed recently) returns the existing job.
+    """
+    wallet_store.record_query(request.wallet_address)
+    job = jobs.queue.submit(request.wallet_address, rebuild=request.rebuild)
+    return job.to_dict(include_result=False)
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str, http_request: Request):
+    job = jobs.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return responses.render(http_request, job.to_dict())
+
+@app.get("/watchlist")
+async def get_watchlist():
+    """Watched wallets in warm-up order (most queried first) with their last warm-up time."""
+    return {"wallets": [vars(wallet) for wallet in wallet_store.load_watchlist()]}
+
+@app.put("/watchlist/{address}")
+async def watch_wallet(address: str):
+    """Adds a wallet to the watchlist; it is warmed right away and on every warm-up pass."""
+    if not wallet_store.is_address(address):
+        raise HTTPException(status_code=400, detail="Not a Solana wallet address")
+    added = wallet_store.watch(address)
+    if added and config.WARMUP_ENABLED:
+        warmup.scheduler.wake()
+    return {"wallet_address": address, "added": added}
+
+@app.delete("/watchlist/{address}")
+async def unwatch_wallet(address: str):
+    if not wallet_store.unwatch(address):
+        raise HTTPException(status_code=404, detail="Wallet is not on the watchlist")
+    return {"wallet_address": address, "removed": True}
+
+@app.get("/wallets/{address}/ledger")
+async def get_wallet_ledger(
+    address: str,
+    http_request: Request,
+    start: int | None = Query(None, description="Only trades at or after this unix time"),
+    end: int | None = Query(None, description="Only trades before this unix time"),
+    mint: str | None = Query(None, description="Only trades with this mint on either side"),
+    min_pnl: float | None = Query(None, description="Only trades with at least this profit/loss"),
+    sort: str = Query("timestamp", pattern="^-?(timestamp|profit_or_loss)$", description="Prefix with '-' for descending"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    format: str = Query("json", pattern="^(json|csv|parquet)$"),
+):
+    """
+    Pages through the stored trade ledger of an analyzed wallet. JSON pages carry
+    a `next_cursor` to pass back for the next page. `format=csv|parquet` streams
+    every matching trade as a file export instead (limit/cursor are ignored).
+    """
+    if wallet_store.get_sync_state(address) is None:
+        raise HTTPException(status_code=404, detail="Wallet has not been analyzed yet")
+
+    query = wallet_store.LedgerQuery(
+        start=start, end=end, mint=mint, min_pnl=min_pnl,
+        sort=sort.lstrip("-"), descending=sort.startswith("-"),
+    )
+
+    if format == "csv":
+        return StreamingResponse(
+            responses.csv_stream(wallet_store.iter_ledger(address, query=query)),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="trade-ledger-{address}.csv"'},
+        )
+    if format == "parquet":
+        if responses.pa is None:
+            raise HTTPException(status_code=406, detail="Parquet export is not available on this server")
+        return StreamingResponse(
+            responses.parquet_stream(wallet_store.iter_ledger(address, query=query)),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="trade-ledger-{address}.parquet"'},
+        )
+
+    try:
+        after = responses.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    page, last_key = wallet_store.query_ledger(address, query, limit, after)
+    return responses.render(http_request, {
+        "wallet_address": address,
+        "trades": page,
+        "next_cursor": responses.encode_cursor(last_key) if last_key else None,
+    })
+
+@app.get("/wallets/{address}/pnl")
+async def get_wallet_pnl(
+    address: str,
+    start: int = Query(..., description="Window start (unix time, inclusive)"),
+    end: int = Query(..., description="Window end (unix time, exclusive)"),
+):
+    """Realized P&L and trade count of an analyzed wallet over an arbitrary time window."""
+    if wallet_store.get_sync_state(address) is None:
+        raise HTTPException(status_code=404, detail="Wallet has not been analyzed yet")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return {"wallet_address": address, **pnl_rollups.window(address, start, end)}
+
+@app.get("/wallets/{address}/chart")
+async def get_wallet_chart(
+    address: str,
+    http_request: Request,
+    resolution: str = Query("auto", pattern="^(auto|trade|hour|day)$"),
+    points: int = Query(None, ge=2, le=10000, description="Most points to return (default CHART_MAX_POINTS)"),
+    start: int | None = None,
+    end: int | None = None,
+):
+    """Cumulative realized P&L series of an analyzed wallet, downsampled to at most `points` points."""
+    if wallet_store.get_sync_state(address) is None:
+        raise HTTPException(status_code=404, detail="Wallet has not been analyzed yet")
+    chart_data = pnl_rollups.chart(address, resolution=resolution, max_points=points, start=start, end=end)
+    return responses.render(http_request, {"wallet_address": address, "chart_data": chart_data})
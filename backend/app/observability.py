@@ -0,0 +1,129 @@
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+from . import config
+
+try:
+    from opentelemetry import trace
+except ImportError:  # optional: spans are only emitted when OpenTelemetry is installed
+    trace = None
+
+# Logging setup, Prometheus metrics and per-request stage timers. Stages
+# (fetch, parse, price, compute, serialize) are timed into a histogram, into the
+# timings of the current request (sent back as a Server-Timing header) and, when
+# enabled, into OpenTelemetry spans.
+
+# --- Logging ---
+
+# LogRecord attributes; everything else on a record came from `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+class TextFormatter(logging.Formatter):
+    """Plain log lines with any `extra` fields appended as key=value."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, logger and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def setup_logging():
+    handler = logging.StreamHandler()
+    if config.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger("app")
+    root.handlers[:] = [handler]
+    root.setLevel(config.LOG_LEVEL)
+    root.propagate = False
+
+# --- Metrics ---
+
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Upstream HTTP requests by response status", ["service", "endpoint", "status"]
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_seconds", "Upstream HTTP request latency", ["service", "endpoint"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+UPSTREAM_THROTTLED = Counter("upstream_throttled_total", "Upstream 429 responses", ["service"])
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Retried upstream requests", ["service", "reason"])
+PRICE_CACHE_LOOKUPS = Counter("price_cache_lookups_total", "Price cache lookups", ["result"])
+WARMUP_WALLETS = Counter("warmup_wallets_total", "Watched wallets warmed by the background warm-up", ["result"])
+STAGE_SECONDS = Histogram(
+    "analysis_stage_seconds", "Time spent per analysis stage", ["stage"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+def endpoint_label(url) -> str:
+    """Low-cardinality endpoint name of an upstream URL: its last path segment ("rpc" for "/")."""
+    path = urlsplit(str(url)).path.rstrip("/")
+    return path.rsplit("/", 1)[-1] or "rpc"
+
+def metrics_response() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+# --- Stage timers ---
+
+# Stage -> seconds for the request being served (None outside a request)
+_timings: contextvars.ContextVar[dict | None] = contextvars.ContextVar("stage_timings", default=None)
+
+_tracer = trace.get_tracer("wallet-analyzer") if trace is not None and config.OTEL_TRACING_ENABLED else None
+
+@contextmanager
+def request_timings():
+    """Collects the stage timings of everything run inside the block (yields the dict)."""
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+@contextmanager
+def stage(name: str):
+    """Times a pipeline stage; repeated stages of one request add up."""
+    with _tracer.start_as_current_span(f"analysis.{name}") if _tracer else nullcontext():
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.labels(name).observe(elapsed)
+            timings = _timings.get()
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + elapsed
+
+def stage_fields(timings: dict[str, float]) -> dict:
+    """`extra=` fields for logging a request's stage timings (seconds)."""
+    return {"stages": {name: round(seconds, 4) for name, seconds in timings.items()}}
+
+def server_timing(timings: dict[str, float]) -> str:
+    """Formats timings as a Server-Timing header value (milliseconds)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
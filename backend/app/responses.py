@@ -0,0 +1,168 @@
+import base64
+import csv
+import io
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from . import observability
+from .services.ledger import TradeLedger
+
+# Response rendering for analysis results.
+# - JSON is rendered with orjson; TradeLedger columns are expanded into row dicts
+#   only here, at serialization time.
+# - Clients sending `Accept: application/x-msgpack` get MessagePack with the
+#   ledger and chart as parallel arrays (mints as ids into a `mints` list),
+#   which is much smaller and cheaper to produce for large ledgers.
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+try:
+    import msgpack
+except ImportError:  # optional: columnar responses are disabled without it
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: Parquet export is disabled without it
+    pa = None
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional: fall back to gzip only
+    BrotliMiddleware = None
+
+def _default(value):
+    if isinstance(value, TradeLedger):
+        return value.to_dicts()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(body) -> bytes:
+    return orjson.dumps(body, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with observability.stage("serialize"):
+            return dumps(content)
+
+def _ledger_columns(ledger: TradeLedger) -> dict:
+    return {
+        "mints": ledger.mints.mints,
+        "signature": ledger.signatures,
+        "timestamp": ledger.timestamps.tolist(),
+        "from_token": ledger.from_ids.tolist(),
+        "to_token": ledger.to_ids.tolist(),
+        "from_amount": ledger.from_amounts.tolist(),
+        "to_amount": ledger.to_amounts.tolist(),
+        "from_price": ledger.from_prices.tolist(),
+        "to_price": ledger.to_prices.tolist(),
+        "profit_or_loss": ledger.pnl.tolist(),
+    }
+
+def _columnar(value):
+    """Recursively converts ledgers and chart series into parallel-array form."""
+    if isinstance(value, TradeLedger):
+        return _ledger_columns(value)
+    if isinstance(value, dict):
+        converted = {key: _columnar(item) for key, item in value.items()}
+        chart = value.get("chart_data")
+        if isinstance(chart, list):
+            converted["chart_data"] = {
+                "date": [point["date"] for point in chart],
+                "pnl": [point["pnl"] for point in chart],
+            }
+        return converted
+    if isinstance(value, list):
+        return [_columnar(item) for item in value]
+    return value
+
+def render(request: Request, body: dict, status_code: int = 200) -> Response:
+    """Renders a result in the format the client asked for via its Accept header."""
+    if msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        with observability.stage("serialize"):
+            content = msgpack.packb(_columnar(body))
+        return Response(content, status_code=status_code, media_type=MSGPACK_MEDIA_TYPE)
+    return ORJSONResponse(body, status_code=status_code)
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(list(key))).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decodes a pagination cursor; raises ValueError if it is malformed."""
+    try:
+        value, signature = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    # Only the shapes encode_cursor produces: a sort value and a signature
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(signature, str):
+        raise ValueError("Invalid cursor")
+    return value, signature
+
+# Columns of exported ledgers (CSV header / Parquet schema order)
+EXPORT_COLUMNS = TradeLedger.COLUMNS + ("price_after_60s",)
+
+def _export_rows(ledger: TradeLedger):
+    for row in ledger.rows():
+        yield (*row, row[8])  # price_after_60s is the delayed to_price
+
+def csv_stream(chunks):
+    """Yields a CSV document chunk by chunk from an iterable of TradeLedger pages."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for ledger in chunks:
+        writer.writerows(_export_rows(ledger))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def parquet_stream(chunks):
+    """Yields a Parquet file with one row group per TradeLedger page."""
+    if pa is None:
+        raise RuntimeError("Parquet export needs the 'pyarrow' package")
+    schema = pa.schema([
+        ("signature", pa.string()), ("timestamp", pa.int64()), ("type", pa.string()),
+        ("from_token", pa.string()), ("to_token", pa.string()), ("from_amount", pa.float64()),
+        ("to_amount", pa.float64()), ("from_price", pa.float64()), ("to_price", pa.float64()),
+        ("profit_or_loss", pa.float64()), ("price_after_60s", pa.float64()),
+    ])
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for ledger in chunks:
+            mints = ledger.mints.mints
+            columns = [
+                ledger.signatures, ledger.timestamps, ["SWAP"] * len(ledger),
+                [mints[i] for i in ledger.from_ids], [mints[i] for i in ledger.to_ids],
+                ledger.from_amounts, ledger.to_amounts, ledger.from_prices, ledger.to_prices,
+                ledger.pnl, ledger.to_prices,
+            ]
+            writer.write_table(pa.Table.from_arrays([pa.array(c) for c in columns], schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+class CompressionMiddleware:
+    """
+    Brotli (when brotli-asgi is installed) or gzip response compression, skipped
+    for streaming paths where compressor buffering would hold back progress events.
+    """
+
+    def __init__(self, app, minimum_size: int, exclude_paths: tuple[str, ...] = ()):
+        self.app = app
+        self.exclude_paths = exclude_paths
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size, gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] not in self.exclude_paths:
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
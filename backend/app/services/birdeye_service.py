@@ -1,110 +1,151 @@
 import httpx
-import asyncio, time, random
-from .. import config
+import asyncio
+import logging
+from .. import config, observability
+from . import http_clients, price_cache, rate_limiter
+from .single_flight import SingleFlight
+
+log = logging.getLogger(__name__)
 
 BIRDEYE_API_URL = "https://public-api.birdeye.so"
 
-# Simple in-memory cache: {(address, minute): price}
-_PRICE_CACHE: dict[tuple[str, int], float] = {}
+# Birdeye returns at most this many candles per /defi/history_price call
+HISTORY_MAX_POINTS = 1000
 
-_SEM = asyncio.Semaphore(2)  # max 2 concurrent calls to avoid 429
+# Max addresses accepted by one /defi/multi_price call
+MULTI_PRICE_MAX_ADDRESSES = 100
 
-async def get_token_price_at_time(token_address: str, timestamp: int):
-    """
-    Fetches the historical price of a token from the Birdeye API.
-    """
-    # Round timestamp to nearest minute to increase cache hits
-    price_timestamp = int(timestamp // 60 * 60)
+# Concurrent current-price fallbacks for the same token share one upstream request
+_inflight = SingleFlight()
 
-    cache_key = (token_address, price_timestamp)
-    cached = _PRICE_CACHE.get(cache_key)
-    if cached is not None:
-        return cached
-
-    headers = {
+def _headers() -> dict:
+    return {
         "X-API-KEY": config.BIRDEYE_API_KEY,
         "x-chain": "solana"  # Adding required header
     }
-    
+
+async def _fetch_history(client: httpx.AsyncClient, token_address: str, time_from: int, time_to: int):
+    """
+    Fetches 1m price points for [time_from, time_to] from the history endpoint.
+    Returns a list of (unix_time, price) sorted by time ([] if Birdeye has no candles
+    in the range), or None if every attempt failed.
+    """
     params = {
         "address": token_address,
         "type": "1m", # 1 minute interval
-        "time_from": price_timestamp,
-        "time_to": price_timestamp + 120 # Check a 2-min window for a match
+        "time_from": time_from,
+        "time_to": time_to,
     }
 
-    print(f"\nFetching price for token {token_address}")
-    print(f"Request params: {params}")
-    print(f"Using API key: {config.BIRDEYE_API_KEY[:5]}...")
+    log.debug("Fetching price history for %s [%d, %d]", token_address, time_from, time_to)
 
-    async with _SEM:  # limit concurrency
-        async with httpx.AsyncClient() as client:
-            retries = 3
-            for attempt in range(1, retries + 1):
-                try:
-                    response = await client.get(
-                        f"{BIRDEYE_API_URL}/defi/history_price", 
-                        params=params, 
-                        headers=headers,
-                        timeout=15.0
-                    )
-                    if response.status_code == 429:
-                        # Rate limited – exponential backoff
-                        wait = 0.5 * attempt + random.random() * 0.5
-                        print(f"Birdeye 429 rate-limit on attempt {attempt}. Sleeping {wait:.2f}s…")
-                        await asyncio.sleep(wait)
-                        continue
-                    response.raise_for_status()
-                    data = response.json()
+    retries = 3
+    for attempt in range(1, retries + 1):
+        try:
+            # 429s are retried (honoring Retry-After) inside the limiter
+            response = await rate_limiter.birdeye.request(
+                client.get,
+                f"{BIRDEYE_API_URL}/defi/history_price",
+                params=params,
+                headers=_headers(),
+                timeout=15.0
+            )
+            response.raise_for_status()
+            data = response.json()
+            if not data.get("success"):
+                log.warning("Price history for %s: Birdeye reported failure: %s", token_address, data.get("message"))
+                return None
 
-                    print(f"Response status: {response.status_code}")
-                    print(f"Full response: {data}")
+            items = (data.get("data") or {}).get("items") or []
+            points = [
+                (int(item["unixTime"]), item.get("value", 0))
+                for item in items
+                if item.get("unixTime") is not None
+            ]
+            points.sort(key=lambda p: p[0])
+            log.debug("Received %d price points for %s", len(points), token_address)
+            return points
+        except httpx.HTTPStatusError as e:
+            log.warning("Price history for %s: HTTP %d on attempt %d", token_address, e.response.status_code, attempt)
+            if e.response.status_code >= 500:
+                observability.UPSTREAM_RETRIES.labels(rate_limiter.birdeye.name, "server_error").inc()
+                await asyncio.sleep(0.5 * attempt)
+                continue
+            break
+        except Exception as e:
+            log.warning("Price history for %s failed on attempt %d: %s", token_address, attempt, e)
+            observability.UPSTREAM_RETRIES.labels(rate_limiter.birdeye.name, "error").inc()
+            await asyncio.sleep(0.3)
+    return None
 
-                    if data.get("success") and data.get("data", {}).get("items"):
-                        price = data["data"]["items"][0].get("value", 0)
-                        print(f"Found price: {price}")
-                        _PRICE_CACHE[cache_key] = price
-                        return price
-                    else:
-                        print("No historical price data – will try current price endpoint")
-                        break
-                except httpx.HTTPStatusError as e:
-                    print(f"HTTP error ({e.response.status_code}) on attempt {attempt}: {e.response.text}")
-                    if e.response.status_code >= 500:
-                        await asyncio.sleep(0.5 * attempt)
-                        continue
-                    break
-                except Exception as e:
-                    print(f"Unexpected error on attempt {attempt}: {str(e)}")
-                    await asyncio.sleep(0.3)
+async def _fetch_current_price(client: httpx.AsyncClient, token_address: str):
+    """
+    Fetches the current price from /defi/price. Returns 0 if Birdeye has no price for
+    the token, or None if the request failed.
+    """
+    try:
+        resp = await rate_limiter.birdeye.request(
+            client.get,
+            f"{BIRDEYE_API_URL}/defi/price",
+            params={"address": token_address},
+            headers=_headers(),
+            timeout=10.0
+        )
+        if resp.status_code == 429:
+            log.warning("429 on fallback current price for %s – giving up", token_address)
+            return None
+        resp.raise_for_status()
+        d = resp.json()
+        if not d.get("success"):
+            log.warning("Fallback current price for %s: Birdeye reported failure: %s", token_address, d.get("message"))
+            return None
+        price = (d.get("data") or {}).get("value") or 0
+        log.debug("Fallback current price for %s: %s", token_address, price)
+        return price
+    except Exception as e:
+        log.warning("Fallback current price for %s failed: %s", token_address, e)
+    return None
 
-            # Fallback to current price
-            try:
-                resp = await client.get(
-                    f"{BIRDEYE_API_URL}/defi/price", 
-                    params={"address": token_address},
-                    headers=headers,
-                    timeout=10.0
-                )
-                if resp.status_code == 429:
-                    print("429 on fallback current price – giving up.")
-                    return 0
-                resp.raise_for_status()
-                d = resp.json()
-                if d.get("success") and d.get("data"):
-                    price = d["data"].get("value", 0)
-                    print(f"Fallback current price: {price}")
-                    _PRICE_CACHE[cache_key] = price
-                    return price
-            except Exception as e:
-                print(f"Fallback current price error: {str(e)}")
+async def get_multi_price(token_addresses: list[str]) -> dict[str, float | None]:
+    """
+    Fetches current prices for up to MULTI_PRICE_MAX_ADDRESSES tokens in one call.
+    Tokens Birdeye has no price for map to None. Raises on HTTP errors.
+    """
+    client = http_clients.get(http_clients.BIRDEYE)
+    response = await rate_limiter.birdeye.request(
+        client.get,
+        f"{BIRDEYE_API_URL}/defi/multi_price",
+        params={"list_address": ",".join(token_addresses)},
+        headers=_headers(),
+        timeout=15.0
+    )
+    response.raise_for_status()
+    data = response.json()
+    items = (data.get("data") or {}) if data.get("success") else {}
 
-    return 0
+    prices = {}
+    for address in token_addresses:
+        value = (items.get(address) or {}).get("value")
+        prices[address] = float(value) if value is not None else None
+    return prices
 
-    # Returning a mock price for now
-    mock_prices = {
-        "So11111111111111111111111111111111111111112": 140.50,
-        "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyB7uHod": 1.00
-    }
-    
-    return mock_prices.get(token_address, 0) 
\ No newline at end of file
+async def get_price_history(token_address: str, time_from: int, time_to: int):
+    """
+    Fetches the 1m price series of a token over [time_from, time_to].
+    The range must span at most HISTORY_MAX_POINTS minutes; see price_resolver for chunking.
+    """
+    return await _fetch_history(http_clients.get(http_clients.BIRDEYE), token_address, time_from, time_to)
+
+async def get_fallback_price(token_address: str, price_timestamp: int):
+    """
+    Current-price fallback used when no historical candle covers a lookup.
+    The result is cached under the historical key with a short TTL. Returns 0 if
+    Birdeye has no price for the token, or None if the request failed.
+    """
+    price = await _inflight.do(
+        ("current", token_address),
+        lambda: _fetch_current_price(http_clients.get(http_clients.BIRDEYE), token_address),
+    )
+    if price is not None:
+        price_cache.put(token_address, price_timestamp, price, ttl=config.CURRENT_PRICE_TTL)
+    return price
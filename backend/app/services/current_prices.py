@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from .. import config
+from . import birdeye_service, mint_registry
+from .single_flight import SingleFlight
+
+# Current prices for unrealized P&L. All open positions are priced with batched
+# /defi/multi_price calls (chunks fetched concurrently), and results are kept in a
+# short-TTL, size-bounded cache shared by every request in the process. A token without a price
+# maps to None ("price unavailable") rather than a made-up fallback value.
+# Stablecoins are priced at 1.0 and mints the registry marks as unpriced at None,
+# without a call.
+
+# mint -> (price or None, expires_at), least recently stored first; bounded by
+# CURRENT_PRICE_CACHE_MAX_ENTRIES
+_cache: OrderedDict[str, tuple[float | None, float]] = OrderedDict()
+_inflight = SingleFlight()
+
+log = logging.getLogger(__name__)
+
+def _cached(mint: str, now: float):
+    entry = _cache.get(mint)
+    if entry is None:
+        return None
+    if entry[1] <= now:
+        del _cache[mint]
+        return None
+    return entry
+
+def _store(mint: str, price: float | None, expires_at: float):
+    _cache[mint] = (price, expires_at)
+    _cache.move_to_end(mint)
+    while len(_cache) > config.CURRENT_PRICE_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+async def _fetch_chunk(mints: list[str], ttl: float) -> dict[str, float | None]:
+    try:
+        prices = await birdeye_service.get_multi_price(mints)
+    except Exception as e:
+        # Not cached: the next request retries instead of serving a stale failure
+        log.warning("Current price lookup failed for %d tokens: %s", len(mints), e)
+        return {mint: None for mint in mints}
+    expires_at = time.time() + ttl
+    for mint, price in prices.items():
+        _store(mint, price, expires_at)
+    return prices
+
+async def _fetch_claimed(claimed: list[str], ttl: float) -> dict[str, float | None]:
+    """Fetches claimed mints in MULTI_PRICE_MAX_ADDRESSES chunks and settles their single-flight futures."""
+    chunk_size = birdeye_service.MULTI_PRICE_MAX_ADDRESSES
+    chunks = [claimed[i:i + chunk_size] for i in range(0, len(claimed), chunk_size)]
+    try:
+        results = await asyncio.gather(*[_fetch_chunk(chunk, ttl) for chunk in chunks])
+    except Exception as e:
+        for mint in claimed:
+            _inflight.fail(mint, e)
+        raise
+    except BaseException:
+        for mint in claimed:
+            _inflight.abandon(mint)
+        raise
+    prices = {}
+    for result in results:
+        prices.update(result)
+    for mint in claimed:
+        _inflight.resolve(mint, prices.get(mint))
+    return prices
+
+async def get_current_prices(mints: list[str], keep_for: float = 0) -> dict[str, float | None]:
+    """
+    Returns {mint: current price, or None if unavailable} for every requested mint.
+    With `keep_for`, cached prices that expire within that many seconds are fetched
+    again, and fetched prices are cached for at least that long (the warm-up uses it
+    so its prices outlast the interval until the next pass).
+    """
+    now = time.time()
+    prices: dict[str, float | None] = {}
+    missing = []
+    for mint in dict.fromkeys(mints):
+        if mint_registry.is_stable(mint):
+            prices[mint] = 1.0
+            continue
+        if mint_registry.has_no_price(mint):
+            prices[mint] = None
+            continue
+        entry = _cached(mint, now)
+        if entry is not None and entry[1] > now + keep_for:
+            prices[mint] = entry[0]
+        else:
+            missing.append(mint)
+
+    claimed, waiting = _inflight.claim(missing)
+    if claimed:
+        # Own task, so a cancelled caller does not cancel the fetch others wait on
+        fetch = asyncio.ensure_future(_fetch_claimed(claimed, max(config.CURRENT_PRICE_TTL, keep_for)))
+        fetch.add_done_callback(lambda t: t.cancelled() or t.exception())
+        prices.update(await asyncio.shield(fetch))
+
+    if waiting:
+        shared = await asyncio.gather(*[asyncio.shield(f) for f in waiting.values()])
+        prices.update(zip(waiting, shared))
+    return prices
@@ -0,0 +1,88 @@
+import numpy as np
+
+from .pnl_columns import WINDOWS_DAYS
+from .transaction_parser import Swap
+
+# Copy-trade delay sweep. Every swap is priced at each candidate delay up front
+# (one price array shaped (swaps, delays, 2)), then a single pass over the swaps
+# applies the pnl_engine.fold rules to all delays at once. Amounts do not depend
+# on prices, so every branch is shared and only costs / P&L are per-delay vectors.
+
+def fold_delays(swaps: list[Swap], prices: np.ndarray):
+    """
+    Folds chronologically ordered swaps for every delay at once.
+    `prices[i, d]` holds the (from, to) price of swap i copied with delay d.
+    Returns (trade_pnl shaped (swaps, delays), open positions
+    {mint: (amount, cost_basis per delay)}, average-cost realized P&L per delay).
+    """
+    delay_count = prices.shape[1]
+    from_amounts = np.fromiter((s.from_amount for s in swaps), dtype=np.float64, count=len(swaps))
+    to_amounts = np.fromiter((s.to_amount for s in swaps), dtype=np.float64, count=len(swaps))
+    value_out = from_amounts[:, None] * prices[:, :, 0]
+    value_in = to_amounts[:, None] * prices[:, :, 1]
+    trade_pnl = value_in - value_out
+
+    zeros = np.zeros(delay_count)
+    realized = np.zeros(delay_count)
+    amounts: dict[str, float] = {}
+    total_costs: dict[str, np.ndarray] = {}
+    cost_bases: dict[str, np.ndarray] = {}
+
+    for i, swap in enumerate(swaps):
+        # Selling from_token at its average cost basis
+        held = amounts.get(swap.from_token, 0.0)
+        if held > 0:
+            realized += (prices[i, :, 0] - cost_bases[swap.from_token]) * swap.from_amount
+            held -= swap.from_amount
+            if held <= 0:
+                amounts[swap.from_token] = 0.0
+                total_costs[swap.from_token] = zeros
+                cost_bases[swap.from_token] = zeros
+            else:
+                amounts[swap.from_token] = held
+
+        # Buying to_token
+        new_amount = amounts.get(swap.to_token, 0.0) + swap.to_amount
+        new_total_cost = total_costs.get(swap.to_token, zeros) + value_in[i]
+        amounts[swap.to_token] = new_amount
+        total_costs[swap.to_token] = new_total_cost
+        cost_bases[swap.to_token] = new_total_cost / new_amount if new_amount > 0 else zeros
+
+    positions = {mint: (amount, cost_bases[mint]) for mint, amount in amounts.items() if amount > 0}
+    return trade_pnl, positions, realized
+
+def comparison_table(delays: list[int], timestamps: np.ndarray, trade_pnl: np.ndarray, positions: dict,
+                     position_realized: np.ndarray, prices_now: dict[str, float | None], now_ts: float) -> list[dict]:
+    """
+    One row per delay with the same P&L windows /analyze reports (realized is the
+    sum of per-trade P&L; unrealized values open positions at current prices).
+    """
+    unrealized = np.zeros(len(delays))
+    for mint, (amount, cost_basis) in positions.items():
+        price = prices_now.get(mint)
+        if price is not None:
+            unrealized += (price - cost_basis) * amount
+
+    totals = trade_pnl.sum(axis=0)
+    windows = {}
+    for label, days in WINDOWS_DAYS.items():
+        start = int(np.searchsorted(timestamps, max(now_ts - days * 86400, 1), side="left"))
+        windows[label] = (trade_pnl[start:].sum(axis=0), start < len(timestamps))
+
+    rows = []
+    for d, delay in enumerate(delays):
+        pnl = {
+            label: {
+                "realized": float(realized[d]) if has_trades else 0,
+                "unrealized": float(unrealized[d]) if has_trades else 0,
+            }
+            for label, (realized, has_trades) in windows.items()
+        }
+        pnl["all_time"] = {"realized": float(totals[d]), "unrealized": float(unrealized[d])}
+        rows.append({
+            "delay_seconds": delay,
+            "pnl": pnl,
+            "total": float(totals[d] + unrealized[d]),
+            "position_realized": float(position_realized[d]),
+        })
+    return rows
@@ -1,7 +1,9 @@
 import httpx
 import asyncio
-from .. import config
-from . import transaction_parser
+import logging
+import time
+from .. import config, observability
+from . import http_clients, parse_pool, rate_limiter, wallet_store
 
 # Updated base URLs – see https://docs.helius.xyz/ for current endpoints
 # REST helper (not currently used but kept for completeness)
@@ -11,90 +13,235 @@ HELIUS_API_URL = f"https://api.helius.xyz/v0/addresses/{{address}}/transactions/
 # If you have a dedicated node, replace with the custom URL shown in the dashboard.
 RPC_URL = config.HELIUS_RPC_URL
 
-async def get_parsed_transaction(client: httpx.AsyncClient, signature: str):
-    """Fetches a single parsed transaction from Helius. Tries multiple RPC URLs if needed."""
-    rpc_candidates = [RPC_URL]
+log = logging.getLogger(__name__)
+
+# RPC endpoint that last answered; tried first so later calls skip the 403/404 probing
+_working_rpc: str | None = None
+
+def _rpc_candidates() -> list[str]:
+    candidates = [RPC_URL]
     # Always include the shared endpoint as a fallback – it works for most keys.
     shared = f"https://rpc.helius.xyz/?api-key={config.HELIUS_API_KEY}"
-    if shared not in rpc_candidates:
-        rpc_candidates.append(shared)
+    if shared not in candidates:
+        candidates.append(shared)
+    if _working_rpc in candidates:
+        candidates.remove(_working_rpc)
+        candidates.insert(0, _working_rpc)
+    return candidates
 
-    for rpc in rpc_candidates:
+async def _post_rpc(client: httpx.AsyncClient, payload):
+    """
+    POSTs a JSON-RPC payload (single call or batch) to the first RPC endpoint that
+    accepts it and returns the decoded body, or None if every endpoint failed.
+    A batch counts as one call per entry against the Helius rate limit.
+    """
+    global _working_rpc
+    cost = len(payload) if isinstance(payload, list) else 1
+    for rpc in _rpc_candidates():
         try:
-            response = await client.post(
-                rpc,
-                json={
-                    "jsonrpc": "2.0",
-                    "id": "1",
-                    "method": "getParsedTransaction",
-                    "params": [signature, {"maxSupportedTransactionVersion": 0}],
-                },
-                timeout=30.0
-            )
+            response = await rate_limiter.helius.request(client.post, rpc, json=payload, cost=cost, timeout=30.0)
             response.raise_for_status()
-            return response.json().get("result")
+            _working_rpc = rpc
+            return response.json()
         except httpx.HTTPStatusError as e:
             # 404s or 403s – try next candidate
             if e.response.status_code in {403, 404}:
-                print(f"RPC {rpc} returned {e.response.status_code} – trying fallback")
-                continue
+                log.warning("RPC %s returned %d – trying fallback", httpx.URL(rpc).host, e.response.status_code)
             else:
                 raise
         except Exception as e:
-            print(f"Error hitting RPC {rpc}: {str(e)} – trying fallback")
-            continue
+            log.warning("Error hitting RPC: %s – trying fallback", e)
+        if _working_rpc == rpc:
+            _working_rpc = None
     return None
 
-async def get_wallet_transactions(wallet_address: str):
+def _get_parsed_transaction_call(signature: str, call_id) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": call_id,
+        "method": "getParsedTransaction",
+        "params": [signature, {"maxSupportedTransactionVersion": 0}],
+    }
+
+async def get_parsed_transaction(client: httpx.AsyncClient, signature: str):
+    """Fetches a single parsed transaction from Helius. Tries multiple RPC URLs if needed."""
+    body = await _post_rpc(client, _get_parsed_transaction_call(signature, "1"))
+    return body.get("result") if isinstance(body, dict) else None
+
+async def _get_parsed_batch(client: httpx.AsyncClient, signatures: list[str]) -> list:
+    body = await _post_rpc(client, [_get_parsed_transaction_call(sig, i) for i, sig in enumerate(signatures)])
+    if body is None:
+        # Every endpoint failed; single calls would only fail the same way
+        log.warning("RPC batch of %d signatures failed on every endpoint", len(signatures))
+        return [None] * len(signatures)
+    if not isinstance(body, list):
+        # Endpoint without batch support – one call per signature
+        log.warning("RPC batch of %d signatures not served – fetching them one by one", len(signatures))
+        return list(await asyncio.gather(*[get_parsed_transaction(client, sig) for sig in signatures]))
+    results = [None] * len(signatures)
+    for item in body:
+        call_id = item.get("id") if isinstance(item, dict) else None
+        if isinstance(call_id, int) and 0 <= call_id < len(results):
+            results[call_id] = item.get("result")
+    return results
+
+async def get_parsed_transactions(client: httpx.AsyncClient, signatures: list[str]) -> list:
     """
-    Fetches and parses historical transactions for a given wallet address using the Helius REST API.
+    Fetches many parsed transactions (None where unavailable, in input order) with
+    JSON-RPC batches of HELIUS_RPC_BATCH_SIZE, at most HELIUS_RPC_CONCURRENCY at once.
     """
-    base_url = HELIUS_API_URL.format(address=wallet_address) + "&limit=100"
-    async with httpx.AsyncClient() as client:
-        tx_overviews = []
-        next_before = None
-        while True:
-            url = base_url + (f"&before={next_before}" if next_before else "")
-            resp = await client.get(url, timeout=30.0)
-            resp.raise_for_status()
-            batch = resp.json()
-            if not batch:
-                break
-            tx_overviews.extend(batch)
-            if len(tx_overviews) >= 500:
-                break
-            next_before = batch[-1]["signature"]
-            if not next_before:
-                break
-
-        swaps = []
-        for tx in tx_overviews:
-            swap = transaction_parser.parse_transaction(tx, wallet_address)
-            if swap:
-                swaps.append(swap)
-
-        if swaps:
-            print(f"Found and parsed {len(swaps)} swaps in enhanced history for {wallet_address}.")
-            return swaps
-
-        # Extract signatures (limit to recent 100 to avoid hitting rate limits)
-        signatures = [tx.get("signature") for tx in tx_overviews][:100]
-
-        async def fetch_and_parse(sig: str):
+    size = config.HELIUS_RPC_BATCH_SIZE
+    slots = asyncio.Semaphore(config.HELIUS_RPC_CONCURRENCY)
+
+    async def fetch(batch: list[str]):
+        async with slots:
             try:
-                parsed_tx = await get_parsed_transaction(client, sig)
-                if parsed_tx:
-                    return transaction_parser.parse_transaction(parsed_tx, wallet_address)
+                return await _get_parsed_batch(client, batch)
             except Exception as e:
-                print(f"Error fetching/parsing tx {sig}: {str(e)}")
-            return None
+                log.warning("Error fetching RPC batch of %d transactions: %s", len(batch), e)
+                return [None] * len(batch)
+
+    chunks = [signatures[i:i + size] for i in range(0, len(signatures), size)]
+    batches = []
+    if chunks and _working_rpc is None:
+        # Find the working endpoint with one batch before fanning out
+        batches.append(await fetch(chunks.pop(0)))
+    batches.extend(await asyncio.gather(*[fetch(chunk) for chunk in chunks]))
+    return [tx for batch in batches for tx in batch]
+
+PAGE_SIZE = 100
+
+async def _fetch_pages(client: httpx.AsyncClient, wallet_address: str, before: str | None = None,
+                       until: str | None = None, max_count: int = 0, on_page=None):
+    """
+    Pages backwards through the enhanced history, starting below `before` and stopping at
+    `until` (exclusive), the end of the history, or after `max_count` transactions (0 = no limit).
+    `on_page(transactions)` is called after every page with the number of transactions in it.
+    Returns the transaction overviews newest first and whether the end of the history was reached.
+    """
+    base_url = HELIUS_API_URL.format(address=wallet_address) + f"&limit={PAGE_SIZE}"
+    if until:
+        base_url += f"&until={until}"
+    tx_overviews = []
+    next_before = before
+    while True:
+        url = base_url + (f"&before={next_before}" if next_before else "")
+        resp = await rate_limiter.helius.request(client.get, url, timeout=30.0)
+        resp.raise_for_status()
+        batch = resp.json()
+        if not batch:
+            return tx_overviews, True
+        tx_overviews.extend(batch)
+        if on_page:
+            on_page(len(batch))
+        if max_count and len(tx_overviews) >= max_count:
+            return tx_overviews[:max_count], False
+        next_before = batch[-1]["signature"]
+        # Only an empty page marks the end: Helius may return short pages mid-history
+        if not next_before:
+            return tx_overviews, True
+
+async def _parse_overviews(tx_overviews: list[dict], wallet_address: str, rpc_fallback: bool):
+    with observability.stage("parse"):
+        swaps = await parse_pool.parse_transactions(tx_overviews, wallet_address)
+
+    if swaps or not rpc_fallback:
+        log.info("Found and parsed %d swaps in enhanced history for %s", len(swaps), wallet_address)
+        return swaps
+
+    signatures = [tx.get("signature") for tx in tx_overviews if tx.get("signature")]
+    limit = config.HELIUS_RPC_FALLBACK_MAX
+    if limit and len(signatures) > limit:
+        # Every signature costs a rate-limit token: keep one sync from draining the budget
+        log.info("RPC fallback for %s limited to the newest %d of %d signatures", wallet_address, limit, len(signatures))
+        signatures = signatures[:limit]
+    rpc_client = http_clients.get(http_clients.HELIUS_RPC)
+    with observability.stage("fetch"):
+        parsed_txs = await get_parsed_transactions(rpc_client, signatures)
+    with observability.stage("parse"):
+        swaps_rpc = await parse_pool.parse_transactions([tx for tx in parsed_txs if tx], wallet_address)
+    log.info("Found and parsed %d swaps via RPC for %s", len(swaps_rpc), wallet_address)
+    return swaps_rpc
+
+async def get_wallet_transactions(wallet_address: str, on_page=None, max_age: float = 0):
+    """
+    Syncs a wallet's swaps into the wallet store and returns all of them, newest first.
+
+    The first sync pages back through the history (up to HELIUS_MAX_TRANSACTIONS).
+    Later syncs always fetch the transactions newer than the newest signature already
+    ingested (at most HELIUS_MAX_TRANSACTIONS per sync); if more than that arrived,
+    the skipped stretch below them is remembered as a gap and filled by later syncs,
+    again at most HELIUS_MAX_TRANSACTIONS at a time. Older pages are backfilled while
+    the wallet holds fewer than HELIUS_MAX_TRANSACTIONS transactions.
+    With `max_age`, a wallet synced less than that many seconds ago is served from
+    the store without calling Helius.
+    `on_page` is forwarded to every page fetch for progress reporting.
+    """
+    client = http_clients.get(http_clients.HELIUS)
+    cap = config.HELIUS_MAX_TRANSACTIONS
+    state = wallet_store.get_sync_state(wallet_address)
+    had_swaps = False
+
+    if state is not None and max_age and time.time() - state.synced_at < max_age:
+        log.info("Using the sync of %s from %ds ago", wallet_address, time.time() - state.synced_at)
+        return wallet_store.load_swaps(wallet_address)
+
+    with observability.stage("fetch"):
+        if state is None:
+            tx_overviews, complete = await _fetch_pages(client, wallet_address, max_count=cap, on_page=on_page)
+            state = wallet_store.SyncState(
+                address=wallet_address,
+                newest_signature=tx_overviews[0].get("signature") if tx_overviews else None,
+                oldest_signature=tx_overviews[-1].get("signature") if tx_overviews else None,
+                tx_count=len(tx_overviews),
+                history_complete=complete,
+                synced_at=0,
+            )
+        else:
+            had_swaps = wallet_store.has_swaps(wallet_address)
+            tx_overviews, reached = await _fetch_pages(
+                client, wallet_address, until=state.newest_signature, max_count=cap, on_page=on_page
+            )
+            if tx_overviews:
+                if not reached:
+                    if state.newest_signature:
+                        # More than a sync's worth arrived: fill the stretch below them later.
+                        # An open gap is widened rather than lost (its upper part is fetched again)
+                        state.gap_before = tx_overviews[-1].get("signature")
+                        state.gap_until = state.gap_until or state.newest_signature
+                    else:
+                        state.history_complete = False
+                state.newest_signature = tx_overviews[0].get("signature")
+                state.oldest_signature = state.oldest_signature or tx_overviews[-1].get("signature")
+                state.tx_count += len(tx_overviews)
+
+            if state.gap_before:
+                gap, filled = await _fetch_pages(
+                    client, wallet_address, before=state.gap_before, until=state.gap_until,
+                    max_count=cap, on_page=on_page,
+                )
+                tx_overviews.extend(gap)
+                state.tx_count += len(gap)
+                if filled:
+                    state.gap_before = state.gap_until = None
+                elif gap:
+                    state.gap_before = gap[-1].get("signature")
 
-        tasks = [fetch_and_parse(sig) for sig in signatures if sig]
-        results = await asyncio.gather(*tasks)
+            budget = max(cap - state.tx_count, 0) if cap else 0
+            if not state.history_complete and state.oldest_signature and (budget > 0 or not cap):
+                older, complete = await _fetch_pages(
+                    client, wallet_address, before=state.oldest_signature, max_count=budget, on_page=on_page
+                )
+                tx_overviews.extend(older)
+                if older:
+                    state.oldest_signature = older[-1].get("signature")
+                    state.tx_count += len(older)
+                state.history_complete = complete
 
-        swaps_rpc = [r for r in results if r]
-        print(f"Found and parsed {len(swaps_rpc)} swaps via RPC for {wallet_address}.")
-        return swaps_rpc
+    log.info("Fetched %d new transactions for %s", len(tx_overviews), wallet_address)
+    new_swaps = await _parse_overviews(tx_overviews, wallet_address, rpc_fallback=not had_swaps)
+    wallet_store.save_sync(state, new_swaps)
+    return wallet_store.load_swaps(wallet_address)
 
 def get_mock_transactions():
     """Returns mock transactions to ensure frontend has data during development."""
@@ -0,0 +1,77 @@
+import logging
+
+import httpx
+from .. import config
+from . import upstream_fixtures
+
+# App-lifetime HTTP clients, one per upstream host so each gets its own
+# connection cap. Created in the FastAPI lifespan hook (see main.lifespan) and
+# shared by every request; reusing them avoids a TCP + TLS handshake per call.
+
+HELIUS = "helius"          # REST enhanced-transactions API
+HELIUS_RPC = "helius_rpc"  # JSON-RPC endpoint(s)
+BIRDEYE = "birdeye"
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+log = logging.getLogger(__name__)
+
+# Stand-in transport every client is created with (see use_transport)
+_transport_override: httpx.AsyncBaseTransport | None = None
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def create_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = config.HTTP2_ENABLED and _http2_available()
+    if config.HTTP2_ENABLED and not http2:
+        log.warning("HTTP/2 requested but the 'h2' package is not installed – using HTTP/1.1")
+    transport = _transport_override or upstream_fixtures.transport(
+        lambda: httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+    )
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=httpx.Timeout(30.0, connect=config.HTTP_CONNECT_TIMEOUT),
+        transport=transport,
+    )
+
+def use_transport(transport: httpx.AsyncBaseTransport | None):
+    """
+    Routes every upstream client through `transport` (an in-process stand-in for
+    Helius/Birdeye, e.g. in benchmarks); None restores the configured transport.
+    Clients created earlier are dropped, so call it before startup().
+    """
+    global _transport_override
+    _transport_override = transport
+    _clients.clear()
+
+async def startup():
+    for name in (HELIUS, HELIUS_RPC, BIRDEYE):
+        if name not in _clients:
+            _clients[name] = create_client()
+
+async def shutdown():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+def get(name: str) -> httpx.AsyncClient:
+    """
+    Returns the shared client for an upstream. Created on first use when the
+    lifespan hook has not run (scripts, one-off tasks).
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = create_client()
+    return client
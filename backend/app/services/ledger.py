@@ -0,0 +1,85 @@
+from array import array
+
+# Compact, column-oriented trade ledger. Instead of one 10-key dict per trade,
+# values live in typed arrays and mint addresses are stored once in a MintTable
+# and referenced by integer id. Rows are turned into dicts only when serialized.
+
+class MintTable:
+    """Interns mint addresses into small integer ids (one table per ledger / analysis)."""
+
+    __slots__ = ("ids", "mints")
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.mints: list[str] = []
+
+    def intern(self, mint: str) -> int:
+        mint_id = self.ids.get(mint)
+        if mint_id is None:
+            mint_id = self.ids[mint] = len(self.mints)
+            self.mints.append(mint)
+        return mint_id
+
+    def __len__(self):
+        return len(self.mints)
+
+class TradeLedger:
+    """Append-only trade ledger stored as parallel typed columns."""
+
+    COLUMNS = (
+        "signature", "timestamp", "type", "from_token", "to_token", "from_amount",
+        "to_amount", "from_price", "to_price", "profit_or_loss",
+    )
+
+    __slots__ = ("mints", "signatures", "timestamps", "from_ids", "to_ids", "from_amounts",
+                 "to_amounts", "from_prices", "to_prices", "pnl")
+
+    def __init__(self, mints: MintTable | None = None):
+        self.mints = mints or MintTable()
+        self.signatures: list[str] = []
+        self.timestamps = array("q")
+        self.from_ids = array("l")
+        self.to_ids = array("l")
+        self.from_amounts = array("d")
+        self.to_amounts = array("d")
+        self.from_prices = array("d")
+        self.to_prices = array("d")
+        self.pnl = array("d")
+
+    def append(self, signature: str, timestamp: int, from_token: str, to_token: str, from_amount: float,
+               to_amount: float, from_price: float, to_price: float, profit_or_loss: float):
+        self.signatures.append(signature)
+        self.timestamps.append(int(timestamp))
+        self.from_ids.append(self.mints.intern(from_token))
+        self.to_ids.append(self.mints.intern(to_token))
+        self.from_amounts.append(from_amount)
+        self.to_amounts.append(to_amount)
+        self.from_prices.append(from_price)
+        self.to_prices.append(to_price)
+        self.pnl.append(profit_or_loss)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def extend(self, other: "TradeLedger"):
+        for row in other.rows():
+            self.append(row[0], row[1], *row[3:])
+
+    def rows(self):
+        """Yields tuples in COLUMNS order (used for storage)."""
+        mints = self.mints.mints
+        for i in range(len(self.signatures)):
+            yield (
+                self.signatures[i], self.timestamps[i], "SWAP", mints[self.from_ids[i]],
+                mints[self.to_ids[i]], self.from_amounts[i], self.to_amounts[i],
+                self.from_prices[i], self.to_prices[i], self.pnl[i],
+            )
+
+    def to_dicts(self) -> list[dict]:
+        """Serializes the ledger to the API's row format."""
+        trades = []
+        for row in self.rows():
+            trade = dict(zip(self.COLUMNS, row))
+            trade["price_after_60s"] = trade["to_price"]  # Add the delayed price for frontend
+            trades.append(trade)
+        return trades
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+from .. import config
+
+# Per-mint facts used by pricing: whether the mint is a stablecoin, and whether
+# Birdeye is known to have no price for it. Persisted in SQLite, shared by every
+# worker process, and held in memory for MINT_REGISTRY_REFRESH seconds at a time;
+# entries are created lazily as mints are marked.
+
+STABLE = "stable"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mints (
+    mint TEXT PRIMARY KEY,
+    kind TEXT,
+    no_price_until INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID
+"""
+
+@dataclass(slots=True)
+class MintInfo:
+    mint: str
+    kind: str | None = None          # STABLE or None
+    no_price_until: int = 0          # unix time until which price lookups are skipped
+
+# Seeded on first use; stored values for these mints are kept
+KNOWN_MINTS = (
+    MintInfo("EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyB7uHod", STABLE),  # USDC
+    MintInfo("Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB", STABLE),  # USDT
+)
+
+_COLUMNS = ("mint", "kind", "no_price_until")
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+_mints: dict[str, MintInfo] = {}
+_loaded_at = 0.0
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(config.MINT_REGISTRY_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(config.MINT_REGISTRY_PATH, check_same_thread=False, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        conn.executemany(
+            f"INSERT OR IGNORE INTO mints ({', '.join(_COLUMNS)}) VALUES (?, ?, ?)",
+            [(m.mint, m.kind, m.no_price_until) for m in KNOWN_MINTS],
+        )
+        conn.commit()
+        _conn = conn
+    return _conn
+
+def _current() -> dict[str, MintInfo]:
+    """The in-memory registry, re-read from SQLite once it is older than MINT_REGISTRY_REFRESH."""
+    global _loaded_at
+    conn = _connection()
+    now = time.monotonic()
+    if not _mints or now - _loaded_at >= config.MINT_REGISTRY_REFRESH:
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM mints").fetchall()
+        _mints.clear()
+        for row in rows:
+            _mints[row[0]] = MintInfo(*row)
+        _loaded_at = now
+    return _mints
+
+def get(mint: str) -> MintInfo | None:
+    with _lock:
+        return _current().get(mint)
+
+def is_stable(mint: str) -> bool:
+    info = get(mint)
+    return info is not None and info.kind == STABLE
+
+def has_no_price(mint: str) -> bool:
+    """True while a mint is marked as having no Birdeye price (see mark_no_price)."""
+    info = get(mint)
+    return info is not None and info.no_price_until > time.time()
+
+def mark_no_price(mints: Iterable[str], ttl: int | None = None):
+    """Skips price lookups for these mints for `ttl` seconds (default MINT_NO_PRICE_TTL)."""
+    until = int(time.time()) + (config.MINT_NO_PRICE_TTL if ttl is None else ttl)
+    with _lock:
+        conn = _connection()
+        known = _current()
+        changed = []
+        for mint in mints:
+            info = known.get(mint)
+            if info is None:
+                info = known[mint] = MintInfo(mint)
+            info.no_price_until = until
+            changed.append(info)
+        if changed:
+            with conn:
+                # Only the mark is written, so a concurrent change to `kind` is not lost
+                conn.executemany(
+                    "INSERT INTO mints (mint, no_price_until) VALUES (?, ?) "
+                    "ON CONFLICT (mint) DO UPDATE SET no_price_until = excluded.no_price_until",
+                    [(info.mint, until) for info in changed],
+                )
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .. import config
+from . import transaction_parser
+
+# Off-loop parsing for large transaction batches. Parsing is pure CPU work, so a
+# big history parsed inline would stall every other request on the worker.
+# Batches below PARSE_POOL_THRESHOLD stay inline (pool overhead isn't worth it);
+# larger ones are split into chunks and parsed in a process pool, or a thread
+# pool on free-threaded builds where threads run in parallel.
+
+_executor: Executor | None = None
+
+def _free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        workers = config.PARSE_POOL_WORKERS or min(4, os.cpu_count() or 1)
+        if _free_threaded():
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def parse_chunk(txs: list[dict], wallet_address: str) -> list[transaction_parser.Swap]:
+    swaps = []
+    for tx in txs:
+        swap = transaction_parser.parse_transaction(tx, wallet_address)
+        if swap:
+            swaps.append(swap)
+    return swaps
+
+async def parse_transactions(txs: list[dict], wallet_address: str) -> list[transaction_parser.Swap]:
+    """Parses transactions into swaps (input order preserved), off the event loop for large batches."""
+    if len(txs) < config.PARSE_POOL_THRESHOLD:
+        return parse_chunk(txs, wallet_address)
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    size = config.PARSE_POOL_CHUNK_SIZE
+    chunks = await asyncio.gather(*[
+        loop.run_in_executor(executor, parse_chunk, txs[i:i + size], wallet_address)
+        for i in range(0, len(txs), size)
+    ])
+    return [swap for chunk in chunks for swap in chunk]
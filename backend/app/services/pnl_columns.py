@@ -0,0 +1,48 @@
+import numpy as np
+
+# Array helpers for P&L charts: timestamp formatting and LTTB downsampling of a
+# cumulative series. Window totals and chart queries live in pnl_rollups.
+
+WINDOWS_DAYS = {"7d": 7, "30d": 30, "90d": 90}
+
+# Latest timestamp datetime can format (9999-12-31 23:59:59)
+_MAX_TIMESTAMP = 253402300799
+
+def format_minutes(timestamps: np.ndarray) -> list[str]:
+    """Formats unix timestamps as 'YYYY-MM-DD HH:MM' (UTC); out-of-range values become 'Invalid Date'."""
+    if len(timestamps) == 0:
+        return []
+    valid = (timestamps >= 0) & (timestamps <= _MAX_TIMESTAMP)
+    dates = np.datetime_as_string(np.where(valid, timestamps, 0).astype("datetime64[s]"), unit="m")
+    dates = np.char.replace(dates, "T", " ")
+    return np.where(valid, dates, "Invalid Date").tolist()
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling: returns the indices of at most
+    `max_points` points (always including the first and last) that keep the
+    visual shape of the series.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max(max_points, 0)], dtype=np.int64)
+    x = x.astype(np.float64)
+    every = (n - 2) / (max_points - 2)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsampled_series(timestamps: np.ndarray, cumulative: np.ndarray, max_points: int) -> list[dict]:
+    """Chart points for a cumulative series, reduced with LTTB to at most max_points."""
+    keep = lttb(timestamps, cumulative, max_points)
+    return [{"date": date, "pnl": value} for date, value in zip(format_minutes(timestamps[keep]), cumulative[keep].tolist())]
@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+
+from .ledger import TradeLedger
+from .transaction_parser import Swap
+
+# Incremental position/P&L state for one wallet. The snapshot is persisted by
+# wallet_store after every analysis, so a re-analysis only folds in the swaps that
+# arrived since the last run: O(new swaps) instead of O(history).
+
+@dataclass
+class PnlSnapshot:
+    wallet: str
+    # mint -> {"amount", "cost_basis", "total_cost"}
+    positions: dict[str, dict] = field(default_factory=dict)
+    # Running P&L realized by selling out of positions at their average cost
+    realized_pnl: float = 0.0
+    # Cursor of the last folded swap, in (timestamp, signature) order
+    last_timestamp: int = 0
+    last_signature: str = ""
+    swap_count: int = 0
+
+def _empty_position() -> dict:
+    return {"amount": 0.0, "cost_basis": 0.0, "total_cost": 0.0}
+
+def _order_key(swap: Swap):
+    return (swap.timestamp, swap.signature)
+
+def pending_swaps(snapshot: PnlSnapshot, swaps: list[Swap]):
+    """
+    Returns (snapshot, swaps to fold, rebuilt). Swaps are folded in chronological
+    order. If the history gained swaps older than the snapshot cursor (a backfill),
+    incremental folding would be wrong, so a fresh snapshot is returned instead.
+    """
+    ordered = sorted(swaps, key=_order_key)
+    cursor = (snapshot.last_timestamp, snapshot.last_signature)
+    new = [s for s in ordered if _order_key(s) > cursor]
+    if snapshot.swap_count + len(new) != len(ordered):
+        return PnlSnapshot(wallet=snapshot.wallet), ordered, True
+    return snapshot, new, False
+
+def fold(snapshot: PnlSnapshot, swaps: list[Swap], prices: list[tuple[float, float]],
+         ledger_rows: TradeLedger | None = None) -> TradeLedger:
+    """
+    Applies chronologically ordered swaps (with their delayed from/to prices) to the
+    snapshot and returns the new trade ledger rows (appended to `ledger_rows` if given).
+    """
+    positions = snapshot.positions
+    ledger_rows = TradeLedger() if ledger_rows is None else ledger_rows
+
+    for swap, (from_price, to_price) in zip(swaps, prices):
+        value_out = swap.from_amount * from_price
+        value_in = swap.to_amount * to_price
+        immediate_pnl = value_in - value_out  # This is the immediate arbitrage gain/loss
+
+        # Selling from_token
+        sold = positions.get(swap.from_token)
+        if sold is not None and sold["amount"] > 0:
+            # Realized P&L for the sold portion at the average cost basis
+            snapshot.realized_pnl += (from_price - sold["cost_basis"]) * swap.from_amount
+            sold["amount"] -= swap.from_amount
+            if sold["amount"] <= 0:
+                positions[swap.from_token] = _empty_position()
+
+        # Buying to_token
+        bought = positions.setdefault(swap.to_token, _empty_position())
+        new_amount = bought["amount"] + swap.to_amount
+        new_total_cost = bought["total_cost"] + value_in
+        bought["amount"] = new_amount
+        bought["total_cost"] = new_total_cost
+        bought["cost_basis"] = new_total_cost / new_amount if new_amount > 0 else 0
+
+        ledger_rows.append(
+            swap.signature, swap.timestamp, swap.from_token, swap.to_token,
+            swap.from_amount, swap.to_amount, from_price, to_price, immediate_pnl,
+        )
+
+        snapshot.last_timestamp, snapshot.last_signature = _order_key(swap)
+        snapshot.swap_count += 1
+
+    return ledger_rows
+
+def open_positions(snapshot: PnlSnapshot) -> dict[str, dict]:
+    return {mint: p for mint, p in snapshot.positions.items() if p["amount"] > 0}
@@ -0,0 +1,62 @@
+import numpy as np
+
+from .. import config
+from . import pnl_columns, wallet_store
+
+# P&L queries answered from the hour/day rollups the wallet store maintains as
+# ledger rows are saved, so windows and charts never rescan the whole ledger.
+
+CHART_RESOLUTIONS = {"trade": 0, "hour": wallet_store.HOUR, "day": wallet_store.DAY}
+
+# Open end of windows that run up to now (trades may carry slightly future timestamps)
+_END_OF_TIME = 2**62
+
+def window(address: str, start: int, end: int) -> dict:
+    """Realized P&L and trade count over an arbitrary [start, end) window."""
+    realized, trades = wallet_store.realized_between(address, start, end)
+    return {"start": start, "end": end, "realized": realized, "trades": trades}
+
+def window_totals(address: str, now_ts: float, unrealized_pnl: float) -> dict:
+    """
+    Realized P&L for the WINDOWS_DAYS windows ending now. As before, a window only
+    reports the unrealized P&L if it contains at least one trade.
+    """
+    total = wallet_store.realized_between(address, 0, _END_OF_TIME)[0]
+    summary = {}
+    for label, days in pnl_columns.WINDOWS_DAYS.items():
+        # Timestamps <= 0 (invalid) are never in a window
+        cutoff = max(int(np.ceil(now_ts - days * 86400)), 1)
+        realized, trades = wallet_store.realized_between(address, cutoff, _END_OF_TIME)
+        summary[label] = {
+            "realized": realized if trades else 0,
+            "unrealized": unrealized_pnl if trades else 0,
+        }
+    summary["all_time"] = {"realized": total, "unrealized": unrealized_pnl}
+    return summary
+
+def chart(address: str, unrealized_pnl: float = 0.0, resolution: str = "auto", max_points: int | None = None,
+          start: int | None = None, end: int | None = None) -> list[dict]:
+    """
+    Cumulative realized P&L (plus `unrealized_pnl`) over [start, end), at most
+    `max_points` points. "trade" plots every trade, "hour"/"day" plot rollup
+    buckets, and "auto" uses trades when they fit and hourly buckets otherwise.
+    Series that are still too long are downsampled with LTTB.
+    """
+    max_points = max_points or config.CHART_MAX_POINTS
+    if resolution == "auto":
+        trades = wallet_store.realized_between(address, start or 0, end if end is not None else _END_OF_TIME)[1]
+        resolution = "trade" if trades <= max_points else "hour"
+    bucket_size = CHART_RESOLUTIONS[resolution]
+
+    if bucket_size:
+        lo = start // bucket_size * bucket_size if start is not None else None
+        timestamps, pnl, _ = wallet_store.load_rollups(address, bucket_size, lo, end)
+        offset_end = lo
+    else:
+        timestamps, pnl = wallet_store.load_ledger_pnl(address, start, end)
+        offset_end = start
+
+    # Realized P&L from before the plotted range carries into the cumulative line
+    offset = wallet_store.realized_between(address, 0, offset_end)[0] if offset_end else 0.0
+    cumulative = np.cumsum(pnl) + offset + unrealized_pnl
+    return pnl_columns.downsampled_series(timestamps, cumulative, max_points)
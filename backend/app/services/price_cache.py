@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from .. import config, observability
+
+# Two-level price store keyed on (mint, minute):
+#   1. a bounded in-memory LRU in front of
+#   2. a SQLite file in WAL mode, shared by every worker process on the host.
+# Historical candles never change and are kept forever. Values that came from the
+# current-price fallback are stored with an expiry and dropped once stale.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    mint TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    price REAL NOT NULL,
+    expires_at INTEGER,
+    PRIMARY KEY (mint, minute)
+) WITHOUT ROWID
+"""
+
+_lru: OrderedDict[tuple[str, int], tuple[float, int | None]] = OrderedDict()
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(config.PRICE_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(config.PRICE_CACHE_PATH, check_same_thread=False, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+def _remember(key: tuple[str, int], price: float, expires_at: int | None):
+    _lru[key] = (price, expires_at)
+    _lru.move_to_end(key)
+    while len(_lru) > config.PRICE_CACHE_MAX_ENTRIES:
+        _lru.popitem(last=False)
+
+def get(mint: str, minute: int) -> float | None:
+    return get_many([(mint, minute)]).get((mint, minute))
+
+def get_many(keys: Iterable[tuple[str, int]], expiring: set | None = None) -> dict[tuple[str, int], float]:
+    """
+    Looks keys up in the LRU first, then in SQLite. Expired entries count as misses.
+    If `expiring` is given, found keys whose entry expires (current-price fallbacks) are added to it.
+    """
+    now = int(time.time())
+    found = {}
+    missing = []
+    with _lock:
+        for key in keys:
+            entry = _lru.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                _lru.move_to_end(key)
+                found[key] = entry[0]
+                if expiring is not None and entry[1] is not None:
+                    expiring.add(key)
+            else:
+                missing.append(key)
+
+        if not missing:
+            observability.PRICE_CACHE_LOOKUPS.labels("hit").inc(len(found))
+            return found
+
+        requested = len(found) + len(missing)
+        conn = _connection()
+        for key in missing:
+            row = conn.execute(
+                "SELECT price, expires_at FROM prices WHERE mint = ? AND minute = ?", key
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                continue
+            _remember(key, row[0], row[1])
+            found[key] = row[0]
+            if expiring is not None and row[1] is not None:
+                expiring.add(key)
+    observability.PRICE_CACHE_LOOKUPS.labels("hit").inc(len(found))
+    observability.PRICE_CACHE_LOOKUPS.labels("miss").inc(requested - len(found))
+    return found
+
+def put(mint: str, minute: int, price: float, ttl: int | None = None):
+    put_many({(mint, minute): price}, ttl=ttl)
+
+def put_many(prices: dict[tuple[str, int], float], ttl: int | None = None):
+    """
+    Stores prices. `ttl=None` means a historical value that is kept permanently;
+    otherwise the entry expires after `ttl` seconds.
+    """
+    if not prices:
+        return
+    expires_at = int(time.time()) + ttl if ttl is not None else None
+    with _lock:
+        for key, price in prices.items():
+            _remember(key, price, expires_at)
+        conn = _connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO prices (mint, minute, price, expires_at) VALUES (?, ?, ?, ?)",
+            [(mint, minute, price, expires_at) for (mint, minute), price in prices.items()],
+        )
+        conn.commit()
+
+def purge_expired():
+    """Deletes stale fallback entries from disk."""
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM prices WHERE expires_at IS NOT NULL AND expires_at <= ?", (int(time.time()),))
+        conn.commit()
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable
+
+from .. import config
+from . import birdeye_service, mint_registry, price_cache
+from .single_flight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+# A lookup at minute m is answered by the first candle in [m, m + MATCH_WINDOW],
+# the same 2-minute window the single-point lookup uses.
+MATCH_WINDOW = 120
+
+# Widest range a single history request may cover (Birdeye caps the number of candles).
+MAX_SPAN = birdeye_service.HISTORY_MAX_POINTS * 60
+
+# (token, minute) lookups currently being fetched by some resolve_prices call
+_inflight = SingleFlight()
+
+def to_minute(timestamp: int) -> int:
+    return int(timestamp // 60 * 60)
+
+def plan_chunks(minutes: list[int]) -> list[tuple[int, int, list[int]]]:
+    """
+    Groups sorted minutes into (time_from, time_to, minutes) ranges no wider than MAX_SPAN.
+    Minutes far apart end up in separate chunks, so we never fetch long idle stretches.
+    """
+    chunks = []
+    start = None
+    members: list[int] = []
+    for minute in minutes:
+        if start is not None and minute + MATCH_WINDOW - start > MAX_SPAN:
+            chunks.append((start, members[-1] + MATCH_WINDOW, members))
+            start = None
+        if start is None:
+            start = minute
+            members = []
+        members.append(minute)
+    if start is not None:
+        chunks.append((start, members[-1] + MATCH_WINDOW, members))
+    return chunks
+
+def match_price(points: list[tuple[int, float]], minute: int):
+    """Returns the first price in [minute, minute + MATCH_WINDOW], or None."""
+    idx = bisect_left(points, (minute, float("-inf")))
+    if idx < len(points) and points[idx][0] <= minute + MATCH_WINDOW:
+        return points[idx][1]
+    return None
+
+async def _resolve_chunk(token: str, time_from: int, time_to: int, minutes: list[int],
+                         on_chunk=None) -> tuple[dict[int, float], bool]:
+    """Returns ({minute: price} for the minutes a candle covers, whether Birdeye answered)."""
+    points = await birdeye_service.get_price_history(token, time_from, time_to)
+    if on_chunk:
+        on_chunk(len(minutes))
+    resolved = {}
+    for minute in minutes:
+        price = match_price(points or [], minute)
+        if price is not None:
+            resolved[minute] = price
+    price_cache.put_many({(token, minute): price for minute, price in resolved.items()})
+    return resolved, points is not None
+
+async def _resolve_token(token: str, minutes: list[int], on_chunk=None) -> tuple[dict[int, float], set[int]]:
+    """Returns ({minute: price}, the minutes priced with the current-price fallback)."""
+    chunk_results = await asyncio.gather(*[
+        _resolve_chunk(token, time_from, time_to, members, on_chunk)
+        for time_from, time_to, members in plan_chunks(minutes)
+    ])
+    resolved = {}
+    answered = True
+    for chunk, chunk_answered in chunk_results:
+        resolved.update(chunk)
+        answered = answered and chunk_answered
+
+    # Minutes with no candle fall back to the current price, like the single lookup does
+    missing = [m for m in minutes if m not in resolved]
+    fallback_minutes = set(missing)
+    if missing:
+        log.info("No historical price for %d lookups of %s – using current price", len(missing), token)
+        fallback = await birdeye_service.get_fallback_price(token, missing[0])
+        if not resolved and answered and fallback == 0:
+            # Both endpoints answered and neither has a price: skip this mint for a while.
+            # A failed request says nothing about the mint, so it never marks one.
+            log.info("No price data at all for %s – marking it unpriced", token)
+            mint_registry.mark_no_price([token])
+            # 0 is the answer for these minutes, not a stand-in for a missing candle
+            fallback_minutes.clear()
+        if fallback is not None:
+            price_cache.put_many({(token, minute): fallback for minute in missing}, ttl=config.CURRENT_PRICE_TTL)
+        for minute in missing:
+            resolved[minute] = fallback or 0
+    return resolved, fallback_minutes
+
+async def _fetch_claimed(claimed: list, needed: dict[str, set[int]], on_chunk):
+    """
+    Fetches the prices of claimed keys and settles their single-flight futures with
+    (price, whether it came from the current-price fallback).
+    Returns ({key: price}, keys priced with the fallback).
+    """
+    log.info("Resolving %d price lookups across %d tokens", len(claimed), len(needed))
+    tokens = list(needed)
+    try:
+        results = await asyncio.gather(*[_resolve_token(t, sorted(needed[t]), on_chunk) for t in tokens])
+    except Exception as e:
+        for key in claimed:
+            _inflight.fail(key, e)
+        raise
+    except BaseException:
+        for key in claimed:
+            _inflight.abandon(key)
+        raise
+    prices = {}
+    fallback = set()
+    for token, (resolved, fallback_minutes) in zip(tokens, results):
+        for minute, price in resolved.items():
+            prices[(token, minute)] = price
+        fallback.update((token, minute) for minute in fallback_minutes)
+    for key in claimed:
+        _inflight.resolve(key, (prices.get(key, 0), key in fallback))
+    return prices, fallback
+
+async def resolve_prices(lookups: Iterable[tuple[str, int]], on_progress=None,
+                         fallback: set | None = None) -> dict[tuple[str, int], float]:
+    """
+    Resolves many (token, timestamp) price lookups with one history request per token
+    (or per MAX_SPAN chunk) instead of one request per lookup.
+    Returns {(token, minute): price}; use `price_for` to read it with a raw timestamp.
+    `on_progress(resolved, total)` is called as lookups are answered.
+    If `fallback` is given, the (token, minute) keys that had no candle and were priced
+    with the current-price fallback (or 0 when that failed too) are added to it.
+    """
+    fallback = set() if fallback is None else fallback
+    keys = {(token, to_minute(timestamp)) for token, timestamp in lookups}
+
+    # Stablecoins are worth 1.0 and mints known to have no price data resolve to 0,
+    # both without touching the cache or Birdeye
+    fixed = {}
+    for token in {token for token, _ in keys}:
+        if mint_registry.is_stable(token):
+            fixed[token] = 1.0
+        elif mint_registry.has_no_price(token):
+            fixed[token] = 0
+    prices = {key: fixed[key[0]] for key in keys if key[0] in fixed}
+    prices.update(price_cache.get_many((key for key in keys if key[0] not in fixed), expiring=fallback))
+
+    # Keys another analysis is already fetching are awaited instead of fetched again
+    claimed, waiting = _inflight.claim(k for k in keys if k not in prices)
+    needed: dict[str, set[int]] = defaultdict(set)
+    for token, minute in claimed:
+        needed[token].add(minute)
+
+    total = len(keys)
+    resolved_count = len(prices)
+    if on_progress:
+        on_progress(resolved_count, total)
+
+    def on_chunk(count: int):
+        nonlocal resolved_count
+        resolved_count += count
+        if on_progress:
+            on_progress(resolved_count, total)
+
+    if needed:
+        # The fetch runs as its own task: if this caller is cancelled (a client went
+        # away), analyses waiting on the claimed keys still get their prices
+        fetch = asyncio.ensure_future(_fetch_claimed(claimed, needed, on_chunk))
+        fetch.add_done_callback(lambda t: t.cancelled() or t.exception())
+        fetched, fetched_fallback = await asyncio.shield(fetch)
+        prices.update(fetched)
+        fallback.update(fetched_fallback)
+
+    if waiting:
+        shared = await asyncio.gather(*[asyncio.shield(f) for f in waiting.values()])
+        for key, (price, from_fallback) in zip(waiting, shared):
+            prices[key] = price
+            if from_fallback:
+                fallback.add(key)
+        on_chunk(len(waiting))
+    return prices
+
+def price_for(prices: dict[tuple[str, int], float], token: str, timestamp: int) -> float:
+    return prices.get((token, to_minute(timestamp)), 0)
@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import httpx
+from .. import config, observability
+
+log = logging.getLogger(__name__)
+
+# Limiter name -> ShareLimiter that requests made inside `limited_to()` must also pass
+_shares: contextvars.ContextVar[dict | None] = contextvars.ContextVar("limiter_shares", default=None)
+
+class RateLimiter:
+    """
+    Process-wide throttle for one upstream API.
+
+    - A token bucket caps the request rate at `rate` per second (bursting up to `burst`).
+    - Concurrency is adaptive (AIMD): every success grows the in-flight limit by
+      1/limit, every 429 halves it, bounded by [min_concurrency, max_concurrency].
+    - A Retry-After header pauses *all* callers until the upstream is ready again.
+
+    One instance is shared by every concurrent /analyze request, so the plan's
+    budget is enforced globally rather than per request.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int,
+                 min_concurrency: int = 1, max_retries: int = 3):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        self.concurrency = float(max_concurrency)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._token_lock = asyncio.Lock()
+        self._slots = asyncio.Condition()
+
+    async def _take_token(self, cost: int = 1):
+        # A cost above the burst size is let through once the bucket is full and
+        # leaves it in debt, so later callers wait for the whole cost to refill
+        need = min(cost, self.burst)
+        async with self._token_lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= need:
+                    self._tokens -= cost
+                    return
+                await asyncio.sleep((need - self._tokens) / self.rate)
+
+    async def acquire(self, cost: int = 1):
+        async with self._slots:
+            while self._in_flight >= int(self.concurrency):
+                await self._slots.wait()
+            self._in_flight += 1
+        try:
+            await self._take_token(cost)
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self):
+        async with self._slots:
+            self._in_flight -= 1
+            self._slots.notify_all()
+
+    def on_success(self):
+        # Additive increase: roughly +1 slot per `concurrency` successful calls
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def on_throttled(self, retry_after: float | None):
+        # Multiplicative decrease
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        # Drop any saved-up burst so we don't hammer the upstream right after the pause
+        self._tokens = min(self._tokens, 0.0)
+        observability.UPSTREAM_THROTTLED.labels(self.name).inc()
+        log.warning("%s 429 – concurrency now %d, retry after %.2fs", self.name, int(self.concurrency), retry_after or 0)
+
+    async def request(self, send, *args, cost: int = 1, **kwargs) -> httpx.Response:
+        """
+        Calls `send(*args, **kwargs)` (e.g. `client.get`) under the limiter, retrying
+        429 responses up to `max_retries` times. Returns the last response.
+        `cost` is the number of upstream calls the request counts as (e.g. the size of
+        a JSON-RPC batch); it is taken from the token bucket on every attempt.
+        """
+        endpoint = observability.endpoint_label(args[0]) if args else "unknown"
+        latency = observability.UPSTREAM_LATENCY.labels(self.name, endpoint)
+        shares = _shares.get()
+        gate = shares.get(self.name, self) if shares else self
+        for attempt in range(1, self.max_retries + 2):
+            if attempt > 1:
+                observability.UPSTREAM_RETRIES.labels(self.name, "429").inc()
+            await gate.acquire(cost)
+            start = time.perf_counter()
+            try:
+                response = await send(*args, **kwargs)
+            except Exception:
+                observability.UPSTREAM_REQUESTS.labels(self.name, endpoint, "error").inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start)
+                await gate.release()
+            observability.UPSTREAM_REQUESTS.labels(self.name, endpoint, str(response.status_code)).inc()
+
+            if response.status_code != 429:
+                self.on_success()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is None:
+                # No hint from the upstream – back off with jitter
+                retry_after = 0.5 * attempt + random.random() * 0.5
+            self.on_throttled(retry_after)
+        return response
+
+class ShareLimiter(RateLimiter):
+    """
+    A fraction of another limiter's budget, for background work: a caller passes
+    this limiter's own (smaller) bucket and slots first, then the parent's, so it
+    never uses more than `fraction` of the upstream's rate and concurrency.
+    Throttling is still tracked by the parent.
+    """
+
+    def __init__(self, parent: RateLimiter, fraction: float):
+        super().__init__(
+            f"{parent.name} ({fraction:.0%})",
+            rate=parent.rate * fraction,
+            burst=max(1, int(parent.burst * fraction)),
+            max_concurrency=max(1, int(parent.max_concurrency * fraction)),
+        )
+        self.parent = parent
+
+    async def acquire(self, cost: int = 1):
+        await super().acquire(cost)
+        try:
+            await self.parent.acquire(cost)
+        except BaseException:
+            await super().release()
+            raise
+
+    async def release(self):
+        await self.parent.release()
+        await super().release()
+
+@contextmanager
+def limited_to(shares: list[ShareLimiter]):
+    """Routes every upstream request made inside the block (and its tasks) through `shares`."""
+    token = _shares.set({share.parent.name: share for share in shares})
+    try:
+        yield
+    finally:
+        _shares.reset(token)
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+birdeye = RateLimiter(
+    "Birdeye",
+    rate=config.BIRDEYE_RPS,
+    burst=config.BIRDEYE_BURST,
+    max_concurrency=config.BIRDEYE_MAX_CONCURRENCY,
+)
+
+helius = RateLimiter(
+    "Helius",
+    rate=config.HELIUS_RPS,
+    burst=config.HELIUS_BURST,
+    max_concurrency=config.HELIUS_MAX_CONCURRENCY,
+)
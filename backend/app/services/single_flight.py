@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+class SingleFlight:
+    """
+    Coalesces concurrent work on the same key: while a key is in flight, later
+    callers wait for the first caller's result instead of repeating the upstream
+    request. Errors are propagated to every waiter and nothing is remembered
+    once the call finishes, so a failure never poisons later lookups.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        """Runs `fn()` for `key` unless a call for it is already in flight, and returns its result."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shield so one cancelled waiter does not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def claim(self, keys: Iterable[Hashable]) -> tuple[list, dict[Hashable, asyncio.Future]]:
+        """
+        Batch variant for callers that answer many keys with one request.
+        Returns (claimed keys, {key: future} for keys someone else is already fetching).
+        The caller must `resolve`, `fail` or `abandon` every claimed key; do not `fail`
+        keys with a CancelledError, which would cancel every waiter.
+        """
+        loop = asyncio.get_running_loop()
+        claimed = []
+        waiting = {}
+        for key in keys:
+            future = self._calls.get(key)
+            if future is not None:
+                waiting[key] = future
+                continue
+            future = loop.create_future()
+            # Mark the exception as retrieved even if nobody ends up waiting on it
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._calls[key] = future
+            claimed.append(key)
+        return claimed, waiting
+
+    def resolve(self, key: Hashable, value: Any):
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def fail(self, key: Hashable, exc: Exception):
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(exc)
+
+    def abandon(self, key: Hashable):
+        """Drops a claimed key without a result (its fetch was torn down); waiters are cancelled."""
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            future.cancel()
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Swap:
     signature: str
     timestamp: int
@@ -9,6 +9,18 @@ class Swap:
     from_amount: float
     to_amount: float
 
+# 10 ** decimals for every decimals value an SPL mint can have
+_SCALES = [10.0 ** d for d in range(256)]
+
+def _ui_amount(amount_raw, decimals) -> float:
+    """Raw token amount scaled by `decimals` (amounts without decimals are taken as-is)."""
+    try:
+        if decimals:
+            return float(amount_raw) / _SCALES[int(decimals)]
+        return float(amount_raw)
+    except (ValueError, TypeError, IndexError):
+        return 0
+
 def parse_transaction(tx: dict, wallet_address: str) -> Swap | None:
     """
     Parses a Helius `getParsedTransaction` response to find swap details.
@@ -28,25 +40,13 @@ def parse_transaction(tx: dict, wallet_address: str) -> Swap | None:
         for ti in swap_event.get("tokenInputs", []):
             if ti.get("userAccount") == wallet_address:
                 mint = ti.get("mint")
-                amt_raw = ti.get("tokenAmount") or 0
-                decimals = ti.get("decimals") or 0
-                try:
-                    amt = float(amt_raw) / (10 ** int(decimals)) if decimals else float(amt_raw)
-                except (ValueError, TypeError):
-                    amt = 0
-                from_token, from_amount = mint, amt
+                from_token, from_amount = mint, _ui_amount(ti.get("tokenAmount") or 0, ti.get("decimals"))
                 break
 
         for to in swap_event.get("tokenOutputs", []):
             if to.get("userAccount") == wallet_address:
                 mint = to.get("mint")
-                amt_raw = to.get("tokenAmount") or 0
-                decimals = to.get("decimals") or 0
-                try:
-                    amt = float(amt_raw) / (10 ** int(decimals)) if decimals else float(amt_raw)
-                except (ValueError, TypeError):
-                    amt = 0
-                to_token, to_amount = mint, amt
+                to_token, to_amount = mint, _ui_amount(to.get("tokenAmount") or 0, to.get("decimals"))
                 break
 
         if from_token and to_token and from_token != to_token and from_amount > 0 and to_amount > 0:
@@ -64,16 +64,16 @@ def parse_transaction(tx: dict, wallet_address: str) -> Swap | None:
         increased_mints = []
 
         for t in tx.get("tokenTransfers", []):
+            # Transfers between other accounts are skipped before any conversion
+            sent = t.get("fromUserAccount") == wallet_address
+            received = t.get("toUserAccount") == wallet_address
+            if not (sent or received):
+                continue
             mint = t.get("mint")
-            amount_raw = t.get("tokenAmount", 0)
-            decimals = t.get("decimals") or 0
-            try:
-                amount = float(amount_raw) / (10 ** int(decimals)) if decimals else float(amount_raw)
-            except (ValueError, TypeError):
-                amount = 0
-            if t.get("fromUserAccount") == wallet_address:
+            amount = _ui_amount(t.get("tokenAmount", 0), t.get("decimals"))
+            if sent:
                 decreased_mints.append((mint, amount))
-            if t.get("toUserAccount") == wallet_address:
+            if received:
                 increased_mints.append((mint, amount))
 
         # If exactly one decrease and one increase treat as swap
@@ -92,21 +92,18 @@ def parse_transaction(tx: dict, wallet_address: str) -> Swap | None:
     # Original parsedTransaction format
     meta = tx.get("meta")
     if tx and meta is not None and not meta.get("err"):
-        pre_balances = {item['mint']: item for item in meta.get("preTokenBalances", []) if item.get('owner') == wallet_address}
-        post_balances = {item['mint']: item for item in meta.get("postTokenBalances", []) if item.get('owner') == wallet_address}
-
-        all_mints = set(pre_balances.keys()) | set(post_balances.keys())
-        decreased_mints = []
-        increased_mints = []
-
-        for mint in all_mints:
-            pre_ui_amount = pre_balances.get(mint, {}).get("uiTokenAmount", {}).get("uiAmount", 0)
-            post_ui_amount = post_balances.get(mint, {}).get("uiTokenAmount", {}).get("uiAmount", 0)
+        # One pass over pre and post balances: mint -> post - pre (a missing side counts as 0)
+        deltas: dict[str, float] = {}
+        for sign, key in ((-1, "preTokenBalances"), (1, "postTokenBalances")):
+            for item in meta.get(key) or ():
+                if item.get("owner") != wallet_address:
+                    continue
+                mint = item["mint"]
+                ui = item.get("uiTokenAmount") or {}
+                deltas[mint] = deltas.get(mint, 0) + sign * (ui.get("uiAmount") or 0)
 
-            if post_ui_amount < pre_ui_amount:
-                decreased_mints.append((mint, pre_ui_amount - post_ui_amount))
-            elif post_ui_amount > pre_ui_amount:
-                increased_mints.append((mint, post_ui_amount - pre_ui_amount))
+        decreased_mints = [(mint, -delta) for mint, delta in deltas.items() if delta < 0]
+        increased_mints = [(mint, delta) for mint, delta in deltas.items() if delta > 0]
 
         if len(decreased_mints) == 1 and len(increased_mints) == 1:
             from_token, from_amount = decreased_mints[0]
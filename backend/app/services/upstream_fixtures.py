@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+import httpx
+
+from .. import config
+
+# Record/replay of upstream (Helius, Birdeye) traffic. With UPSTREAM_MODE=record
+# every response is saved under FIXTURES_DIR; with UPSTREAM_MODE=replay the HTTP
+# clients are served from those files instead of the network, so the app, the
+# CLI and the benchmarks run offline and without API keys.
+
+# Query parameters that carry credentials and must not reach the fixture key or file
+_SECRET_PARAMS = {"api-key", "api_key"}
+# Response headers worth replaying (the services read nothing else)
+_KEPT_HEADERS = {"content-type", "retry-after"}
+
+def _public_url(url: httpx.URL) -> httpx.URL:
+    params = sorted((k, v) for k, v in url.params.multi_items() if k not in _SECRET_PARAMS)
+    return url.copy_with(params=params)
+
+def fixture_key(request: httpx.Request) -> str:
+    """Stable key of a request: method, URL without credentials (sorted query) and body."""
+    digest = hashlib.sha1()
+    digest.update(request.method.encode())
+    digest.update(str(_public_url(request.url)).encode())
+    digest.update(request.content)
+    return digest.hexdigest()
+
+def fixture_path(directory: str, request: httpx.Request) -> str:
+    return os.path.join(directory, request.url.host, f"{fixture_key(request)}.json")
+
+def write_fixture(directory: str, request: httpx.Request, status: int, headers: dict, body: bytes):
+    """Saves the response to `request` under `directory`, where ReplayTransport looks it up."""
+    path = fixture_path(directory, request)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fixture = {
+        "request": {"method": request.method, "url": str(_public_url(request.url))},
+        "status": status,
+        "headers": headers,
+        "body": body.decode("utf-8", errors="replace"),
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(fixture, f)
+    os.replace(tmp, path)
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards requests to the network and writes every response to a fixture file."""
+
+    def __init__(self, directory: str, inner: httpx.AsyncBaseTransport):
+        self.directory = directory
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()  # decoded (Content-Encoding is dropped below)
+        await response.aclose()
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS}
+        write_fixture(self.directory, request, response.status_code, headers, body)
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves recorded fixtures; a request that was never recorded fails like an unreachable host."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = fixture_path(self.directory, request)
+        try:
+            with open(path) as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise httpx.ConnectError(
+                f"No recorded fixture for {request.method} {_public_url(request.url)}", request=request
+            )
+        return httpx.Response(
+            fixture["status"], headers=fixture["headers"], content=fixture["body"].encode(), request=request
+        )
+
+def transport(inner_factory) -> httpx.AsyncBaseTransport | None:
+    """
+    Transport for UPSTREAM_MODE: None in live mode (httpx's default), otherwise a
+    recorder around `inner_factory()` or a replayer.
+    """
+    if config.UPSTREAM_MODE == "record":
+        return RecordingTransport(config.FIXTURES_DIR, inner_factory())
+    if config.UPSTREAM_MODE == "replay":
+        return ReplayTransport(config.FIXTURES_DIR)
+    return None
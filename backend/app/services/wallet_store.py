@@ -0,0 +1,505 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .. import config
+from .ledger import MintTable, TradeLedger
+from .pnl_engine import PnlSnapshot
+from .transaction_parser import Swap
+
+# Per-wallet transaction store. Remembers the newest (and oldest) signature already
+# ingested for each wallet plus every Swap parsed so far, so a re-analysis only has
+# to fetch the pages that are newer than the last sync.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (
+    address TEXT PRIMARY KEY,
+    newest_signature TEXT,
+    oldest_signature TEXT,
+    tx_count INTEGER NOT NULL DEFAULT 0,
+    history_complete INTEGER NOT NULL DEFAULT 0,
+    synced_at INTEGER NOT NULL,
+    gap_before TEXT,
+    gap_until TEXT
+);
+CREATE TABLE IF NOT EXISTS swaps (
+    wallet TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    from_token TEXT NOT NULL,
+    to_token TEXT NOT NULL,
+    from_amount REAL NOT NULL,
+    to_amount REAL NOT NULL,
+    PRIMARY KEY (wallet, signature)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS swaps_by_time ON swaps (wallet, timestamp);
+CREATE TABLE IF NOT EXISTS pnl_snapshots (
+    wallet TEXT PRIMARY KEY,
+    positions TEXT NOT NULL,
+    realized_pnl REAL NOT NULL,
+    last_timestamp INTEGER NOT NULL,
+    last_signature TEXT NOT NULL,
+    swap_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger (
+    wallet TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    from_token TEXT NOT NULL,
+    to_token TEXT NOT NULL,
+    from_amount REAL NOT NULL,
+    to_amount REAL NOT NULL,
+    from_price REAL NOT NULL,
+    to_price REAL NOT NULL,
+    profit_or_loss REAL NOT NULL,
+    price_source TEXT NOT NULL DEFAULT 'history',
+    PRIMARY KEY (wallet, signature)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ledger_by_time ON ledger (wallet, timestamp);
+CREATE TABLE IF NOT EXISTS pnl_rollups (
+    wallet TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    realized REAL NOT NULL,
+    trades INTEGER NOT NULL,
+    PRIMARY KEY (wallet, resolution, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watchlist (
+    address TEXT PRIMARY KEY,
+    added_at INTEGER NOT NULL,
+    query_score REAL NOT NULL DEFAULT 0,
+    scored_at INTEGER NOT NULL,
+    warmed_at INTEGER
+);
+"""
+
+# Solana addresses: base58-encoded 32-byte public keys
+_ADDRESS = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+
+def is_address(address: str) -> bool:
+    return _ADDRESS.fullmatch(address) is not None
+
+# Bucket widths (seconds) of the realized P&L rollups kept next to the ledger
+HOUR = 3600
+DAY = 86400
+ROLLUP_RESOLUTIONS = (HOUR, DAY)
+
+@dataclass
+class SyncState:
+    address: str
+    newest_signature: str | None
+    oldest_signature: str | None
+    tx_count: int
+    history_complete: bool
+    synced_at: int
+    # Transactions below `gap_before` down to `gap_until` (exclusive) were skipped by a
+    # forward sync that ran out of budget; they are fetched before anything newer
+    gap_before: str | None = None
+    gap_until: str | None = None
+
+@dataclass
+class WatchedWallet:
+    address: str
+    added_at: int
+    # Decayed count of interactive queries (see record_query)
+    query_score: float
+    warmed_at: int | None
+
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(config.WALLET_STORE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(config.WALLET_STORE_PATH, check_same_thread=False, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _add_missing_columns(conn)
+        _migrate(conn)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+# Columns added after the first release: (table, column, definition)
+_ADDED_COLUMNS = (
+    ("wallets", "gap_before", "TEXT"),
+    ("wallets", "gap_until", "TEXT"),
+    ("ledger", "price_source", "TEXT NOT NULL DEFAULT 'history'"),
+)
+
+# How a ledger row's prices were found: historical candles, or (for at least one side)
+# the current-price fallback because no candle existed yet
+PRICE_HISTORY = "history"
+PRICE_FALLBACK = "fallback"
+
+def _add_missing_columns(conn: sqlite3.Connection):
+    """Brings stores created by older versions up to the current schema."""
+    for table, column, definition in _ADDED_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _backfill_rollups(conn: sqlite3.Connection):
+    """Builds the rollups of each resolution a wallet's stored ledger has none of yet."""
+    for resolution in ROLLUP_RESOLUTIONS:
+        conn.execute(
+            "INSERT INTO pnl_rollups (wallet, resolution, bucket, realized, trades) "
+            "SELECT wallet, ?, timestamp - timestamp % ?, SUM(profit_or_loss), COUNT(*) FROM ledger "
+            "WHERE NOT EXISTS (SELECT 1 FROM pnl_rollups r WHERE r.wallet = ledger.wallet AND r.resolution = ?) "
+            "GROUP BY wallet, timestamp - timestamp % ?",
+            (resolution, resolution, resolution, resolution),
+        )
+
+# One-time data migrations, in order; PRAGMA user_version counts how many a store has run
+_MIGRATIONS = (_backfill_rollups,)
+
+def _migrate(conn: sqlite3.Connection):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for migration in _MIGRATIONS[version:]:
+        migration(conn)
+    conn.execute(f"PRAGMA user_version = {len(_MIGRATIONS)}")
+
+def get_sync_state(address: str) -> SyncState | None:
+    with _lock:
+        row = _connection().execute(
+            "SELECT address, newest_signature, oldest_signature, tx_count, history_complete, synced_at, "
+            "gap_before, gap_until FROM wallets WHERE address = ?",
+            (address,),
+        ).fetchone()
+    if row is None:
+        return None
+    return SyncState(row[0], row[1], row[2], row[3], bool(row[4]), row[5], row[6], row[7])
+
+def save_sync(state: SyncState, new_swaps: list[Swap]):
+    """Appends newly parsed swaps and advances the wallet's sync cursor in one transaction."""
+    state.synced_at = int(time.time())
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO swaps (wallet, signature, timestamp, from_token, to_token, from_amount, to_amount) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (state.address, s.signature, s.timestamp, s.from_token, s.to_token, s.from_amount, s.to_amount)
+                    for s in new_swaps
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO wallets (address, newest_signature, oldest_signature, tx_count, "
+                "history_complete, synced_at, gap_before, gap_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (state.address, state.newest_signature, state.oldest_signature, state.tx_count,
+                 int(state.history_complete), state.synced_at, state.gap_before, state.gap_until),
+            )
+
+def has_swaps(address: str) -> bool:
+    with _lock:
+        row = _connection().execute("SELECT 1 FROM swaps WHERE wallet = ? LIMIT 1", (address,)).fetchone()
+    return row is not None
+
+def load_swaps(address: str) -> list[Swap]:
+    """Returns every stored swap of a wallet, newest first (the order Helius pages in)."""
+    with _lock:
+        rows = _connection().execute(
+            "SELECT signature, timestamp, from_token, to_token, from_amount, to_amount "
+            "FROM swaps WHERE wallet = ? ORDER BY timestamp DESC, signature DESC",
+            (address,),
+        ).fetchall()
+    # Share one string object per mint across all swaps of the wallet
+    mints = MintTable()
+    return [
+        Swap(sig, ts, mints.mints[mints.intern(a)], mints.mints[mints.intern(b)], from_amount, to_amount)
+        for sig, ts, a, b, from_amount, to_amount in rows
+    ]
+
+_LEDGER_COLUMNS = TradeLedger.COLUMNS
+
+def load_pnl_snapshot(address: str) -> PnlSnapshot:
+    with _lock:
+        row = _connection().execute(
+            "SELECT positions, realized_pnl, last_timestamp, last_signature, swap_count "
+            "FROM pnl_snapshots WHERE wallet = ?",
+            (address,),
+        ).fetchone()
+    if row is None:
+        return PnlSnapshot(wallet=address)
+    return PnlSnapshot(address, json.loads(row[0]), row[1], row[2], row[3], row[4])
+
+def save_pnl_snapshot(snapshot: PnlSnapshot, new_rows: TradeLedger, reset: bool = False,
+                      fallback: set[str] = frozenset()):
+    """
+    Persists the snapshot and appends its new ledger rows atomically.
+    `reset` replaces the stored ledger (after a rebuild) instead of appending to it.
+    `fallback` holds the signatures of rows priced with the current-price fallback.
+    Rows may run past the snapshot cursor; those are provisional and are replaced when
+    the next analysis folds the same swaps again.
+    """
+    with _lock:
+        conn = _connection()
+        with conn:
+            if reset:
+                conn.execute("DELETE FROM ledger WHERE wallet = ?", (snapshot.wallet,))
+                conn.execute("DELETE FROM pnl_rollups WHERE wallet = ?", (snapshot.wallet,))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO ledger (wallet, {', '.join(_LEDGER_COLUMNS)}, price_source) "
+                f"VALUES (?, {', '.join('?' * len(_LEDGER_COLUMNS))}, ?)",
+                [(snapshot.wallet, *row, PRICE_FALLBACK if row[0] in fallback else PRICE_HISTORY)
+                 for row in new_rows.rows()],
+            )
+            # Touched buckets are recomputed from the ledger rather than incremented, so a
+            # swap folded by two concurrent analyses (stored once above) is counted once
+            conn.executemany(
+                "INSERT OR REPLACE INTO pnl_rollups (wallet, resolution, bucket, realized, trades) "
+                "SELECT ?, ?, ?, TOTAL(profit_or_loss), COUNT(*) FROM ledger "
+                "WHERE wallet = ? AND timestamp >= ? AND timestamp < ?",
+                [(snapshot.wallet, resolution, bucket, snapshot.wallet, bucket, bucket + resolution)
+                 for resolution, bucket in _rollup_buckets(new_rows)],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO pnl_snapshots "
+                "(wallet, positions, realized_pnl, last_timestamp, last_signature, swap_count) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (snapshot.wallet, json.dumps(snapshot.positions), snapshot.realized_pnl,
+                 snapshot.last_timestamp, snapshot.last_signature, snapshot.swap_count),
+            )
+
+def _rollup_buckets(ledger: TradeLedger) -> set[tuple[int, int]]:
+    """The (resolution, bucket start) rollups the ledger rows fall into."""
+    return {
+        (resolution, timestamp - timestamp % resolution)
+        for timestamp in set(ledger.timestamps)
+        for resolution in ROLLUP_RESOLUTIONS
+    }
+
+def load_rollups(address: str, resolution: int, start: int | None = None, end: int | None = None):
+    """
+    Returns the (bucket start, realized, trades) arrays of one rollup resolution for
+    the buckets starting in [start, end), oldest first.
+    """
+    sql = "SELECT bucket, realized, trades FROM pnl_rollups WHERE wallet = ? AND resolution = ?"
+    params: list = [address, resolution]
+    if start is not None:
+        sql += " AND bucket >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND bucket < ?"
+        params.append(end)
+    with _lock:
+        rows = _connection().execute(sql + " ORDER BY bucket", params).fetchall()
+    columns = list(zip(*rows)) or [(), (), ()]
+    return (
+        np.fromiter(columns[0], dtype=np.int64, count=len(rows)),
+        np.fromiter(columns[1], dtype=np.float64, count=len(rows)),
+        np.fromiter(columns[2], dtype=np.int64, count=len(rows)),
+    )
+
+def _split_range(start: int, end: int, resolutions: tuple[int, ...]):
+    """
+    Splits [start, end) into (resolution, lo, hi) pieces: whole buckets of the widest
+    resolution that fits, narrower buckets at the edges, and resolution 0 (raw ledger
+    rows) for the sub-bucket remainders.
+    """
+    if start >= end:
+        return []
+    if not resolutions:
+        return [(0, start, end)]
+    resolution, narrower = resolutions[0], resolutions[1:]
+    lo = -(-start // resolution) * resolution
+    hi = end // resolution * resolution
+    if lo >= hi:
+        return _split_range(start, end, narrower)
+    return _split_range(start, lo, narrower) + [(resolution, lo, hi)] + _split_range(hi, end, narrower)
+
+def realized_between(address: str, start: int, end: int) -> tuple[float, int]:
+    """
+    Returns (realized P&L, trade count) over [start, end). Answered from day and hour
+    rollups; only the partial hours at the edges read ledger rows.
+    """
+    realized, trades = 0.0, 0
+    with _lock:
+        conn = _connection()
+        for resolution, lo, hi in _split_range(start, end, (DAY, HOUR)):
+            if resolution:
+                row = conn.execute(
+                    "SELECT TOTAL(realized), TOTAL(trades) FROM pnl_rollups "
+                    "WHERE wallet = ? AND resolution = ? AND bucket >= ? AND bucket < ?",
+                    (address, resolution, lo, hi),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT TOTAL(profit_or_loss), COUNT(*) FROM ledger "
+                    "WHERE wallet = ? AND timestamp >= ? AND timestamp < ?",
+                    (address, lo, hi),
+                ).fetchone()
+            realized += row[0]
+            trades += int(row[1])
+    return realized, trades
+
+def _to_ledger(rows) -> TradeLedger:
+    ledger = TradeLedger()
+    for signature, timestamp, _, *values in rows:
+        ledger.append(signature, timestamp, *values)
+    return ledger
+
+def load_ledger(address: str) -> TradeLedger:
+    """Returns the stored trade ledger of a wallet, oldest first."""
+    with _lock:
+        rows = _connection().execute(
+            f"SELECT {', '.join(_LEDGER_COLUMNS)} FROM ledger WHERE wallet = ? "
+            "ORDER BY timestamp, signature",
+            (address,),
+        ).fetchall()
+    return _to_ledger(rows)
+
+# Sortable ledger columns; pagination is keyset-based on (column, signature)
+LEDGER_SORT_COLUMNS = ("timestamp", "profit_or_loss")
+
+@dataclass
+class LedgerQuery:
+    start: int | None = None     # inclusive unix time
+    end: int | None = None       # exclusive unix time
+    mint: str | None = None      # trades where the mint is either side
+    min_pnl: float | None = None
+    sort: str = "timestamp"      # one of LEDGER_SORT_COLUMNS
+    descending: bool = False
+    through: tuple | None = None # inclusive (timestamp, signature) bound, e.g. a snapshot cursor
+
+def query_ledger(address: str, query: LedgerQuery, limit: int, after: tuple | None = None):
+    """
+    Returns (TradeLedger page, key of its last row or None when there are no more rows).
+    Pass the returned key as `after` to fetch the next page.
+    """
+    if query.sort not in LEDGER_SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {query.sort}")
+    clauses = ["wallet = ?"]
+    params: list = [address]
+    if query.start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(query.start)
+    if query.end is not None:
+        clauses.append("timestamp < ?")
+        params.append(query.end)
+    if query.mint:
+        clauses.append("(from_token = ? OR to_token = ?)")
+        params.extend([query.mint, query.mint])
+    if query.min_pnl is not None:
+        clauses.append("profit_or_loss >= ?")
+        params.append(query.min_pnl)
+    if query.through is not None:
+        clauses.append("(timestamp, signature) <= (?, ?)")
+        params.extend(query.through)
+    if after is not None:
+        clauses.append(f"({query.sort}, signature) {'<' if query.descending else '>'} (?, ?)")
+        params.extend(after)
+    direction = "DESC" if query.descending else "ASC"
+    sql = (
+        f"SELECT {', '.join(_LEDGER_COLUMNS)} FROM ledger WHERE {' AND '.join(clauses)} "
+        f"ORDER BY {query.sort} {direction}, signature {direction} LIMIT ?"
+    )
+    with _lock:
+        rows = _connection().execute(sql, (*params, limit + 1)).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page = _to_ledger(rows)
+    if not has_more:
+        return page, None
+    sort_index = _LEDGER_COLUMNS.index(query.sort)
+    return page, (rows[-1][sort_index], rows[-1][0])
+
+def iter_ledger(address: str, chunk_size: int = 500, query: LedgerQuery | None = None):
+    """Yields the stored ledger in TradeLedger chunks (oldest first by default) without loading it all."""
+    query = query or LedgerQuery()
+    after = None
+    while True:
+        page, after = query_ledger(address, query, chunk_size, after)
+        if len(page):
+            yield page
+        if after is None:
+            return
+
+def load_ledger_pnl(address: str, start: int | None = None, end: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the (timestamp, profit_or_loss) columns of trades in [start, end) as time-sorted arrays."""
+    sql = "SELECT timestamp, profit_or_loss FROM ledger WHERE wallet = ?"
+    params: list = [address]
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        params.append(end)
+    with _lock:
+        rows = _connection().execute(sql + " ORDER BY timestamp, signature", params).fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    timestamps, pnl = zip(*rows)
+    return np.fromiter(timestamps, dtype=np.int64, count=len(rows)), np.fromiter(pnl, dtype=np.float64, count=len(rows))
+
+def _decayed(score: float, scored_at: int, now: int) -> float:
+    return score * 0.5 ** (max(0, now - scored_at) / config.WARMUP_QUERY_HALF_LIFE)
+
+def watch(address: str) -> bool:
+    """Adds a wallet to the warm-up watchlist; False if it was already on it."""
+    now = int(time.time())
+    with _lock:
+        conn = _connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO watchlist (address, added_at, scored_at) VALUES (?, ?, ?)",
+                (address, now, now),
+            )
+    return cursor.rowcount > 0
+
+def unwatch(address: str) -> bool:
+    with _lock:
+        conn = _connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM watchlist WHERE address = ?", (address,))
+    return cursor.rowcount > 0
+
+def is_watched(address: str) -> bool:
+    with _lock:
+        row = _connection().execute("SELECT 1 FROM watchlist WHERE address = ?", (address,)).fetchone()
+    return row is not None
+
+def record_query(address: str):
+    """
+    Counts an interactive query of a watched wallet (no-op for other wallets).
+    Older queries weigh less: the score halves every WARMUP_QUERY_HALF_LIFE seconds.
+    """
+    now = int(time.time())
+    with _lock:
+        conn = _connection()
+        row = conn.execute("SELECT query_score, scored_at FROM watchlist WHERE address = ?", (address,)).fetchone()
+        if row is None:
+            return
+        with conn:
+            conn.execute(
+                "UPDATE watchlist SET query_score = ?, scored_at = ? WHERE address = ?",
+                (_decayed(row[0], row[1], now) + 1, now, address),
+            )
+
+def load_watchlist() -> list[WatchedWallet]:
+    """Watched wallets with their query scores decayed to now, most queried first."""
+    now = int(time.time())
+    with _lock:
+        rows = _connection().execute(
+            "SELECT address, added_at, query_score, scored_at, warmed_at FROM watchlist"
+        ).fetchall()
+    watched = [WatchedWallet(row[0], row[1], _decayed(row[2], row[3], now), row[4]) for row in rows]
+    watched.sort(key=lambda w: (-w.query_score, w.added_at))
+    return watched
+
+def mark_warmed(address: str):
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute("UPDATE watchlist SET warmed_at = ? WHERE address = ?", (int(time.time()), address))
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+
+from . import analysis, config, observability
+from .services import price_cache, rate_limiter, wallet_store
+
+log = logging.getLogger(__name__)
+
+# Background warm-up of watched wallets. Every WARMUP_INTERVAL seconds a pass walks
+# the watchlist, most queried wallets first, syncing each wallet and resolving its
+# new swap prices and current position prices (see analysis.warm_wallet), so an
+# interactive /analyze finds everything in the local stores. All upstream calls of
+# a pass go through share limiters, keeping the warm-up within WARMUP_RATE_SHARE of
+# each upstream's budget; interactive requests get the rest. Each pass also drops
+# stale current-price fallbacks from the price cache.
+
+class WarmupScheduler:
+    def __init__(self, interval: float, rate_share: float):
+        self.interval = interval
+        self.shares = [
+            rate_limiter.ShareLimiter(limiter, rate_share)
+            for limiter in (rate_limiter.helius, rate_limiter.birdeye)
+        ]
+        self._task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+
+    async def start(self):
+        for address in config.WATCHLIST:
+            if wallet_store.is_address(address):
+                wallet_store.watch(address)
+            else:
+                log.warning("Ignoring WATCHLIST entry %r: not a Solana wallet address", address)
+        self._task = asyncio.create_task(self._run(), name="watchlist-warmup")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            # Cleared before the pass, so a wake-up during it starts another one
+            self._wake.clear()
+            try:
+                await self.warm_all()
+            except Exception:
+                log.exception("Watchlist warm-up pass failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, self.interval - (time.monotonic() - started)))
+            except asyncio.TimeoutError:
+                pass
+
+    def wake(self):
+        """Starts the next pass now (e.g. after a wallet was added to the watchlist)."""
+        self._wake.set()
+
+    async def warm_all(self) -> int:
+        """One pass over the watchlist; returns the number of wallets warmed."""
+        price_cache.purge_expired()
+        watched = wallet_store.load_watchlist()
+        if not watched:
+            return 0
+        started = time.perf_counter()
+        warmed = 0
+        for wallet in watched:
+            if await self.warm(wallet.address):
+                warmed += 1
+        log.info("Warmed %d/%d watched wallets in %.1fs", warmed, len(watched), time.perf_counter() - started)
+        return warmed
+
+    async def warm(self, address: str) -> bool:
+        """Warms one wallet within the warm-up's share of the rate budget."""
+        try:
+            with rate_limiter.limited_to(self.shares), observability.request_timings() as timings:
+                stats = await analysis.warm_wallet(address)
+        except Exception as e:
+            log.warning("Warm-up of %s failed: %s", address, e)
+            observability.WARMUP_WALLETS.labels("error").inc()
+            return False
+        wallet_store.mark_warmed(address)
+        observability.WARMUP_WALLETS.labels("ok").inc()
+        log.debug("Warmed %s", address, extra={**stats, **observability.stage_fields(timings)})
+        return True
+
+scheduler = WarmupScheduler(interval=config.WARMUP_INTERVAL, rate_share=config.WARMUP_RATE_SHARE)
@@ -0,0 +1,108 @@
+"""
+End-to-end /analyze benchmark against an in-process Helius/Birdeye stand-in
+(see synthetic_upstream), so it runs offline and without API keys.
+
+For synthetic wallets of each size it reports the latency of a cold analysis
+(empty wallet store and price cache) and of a warm re-analysis (incremental,
+nothing new), the upstream calls each one made, and the peak RSS of the
+process. Every size runs in a fresh process so peaks are not shared.
+
+    cd backend && python -m benchmarks.bench_analyze [sizes...]   # default: 100 1000 10000 100000
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Offline settings; must be in place before the app reads its config
+os.environ.setdefault("UPSTREAM_MODE", "replay")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="wallet-analyzer-bench-"))
+os.environ.setdefault("HELIUS_MAX_TRANSACTIONS", "1000000")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+for _service in ("HELIUS", "BIRDEYE"):
+    # The stand-in has no rate limit; keep the limiter out of the measurement
+    os.environ.setdefault(f"{_service}_RPS", "1000000")
+    os.environ.setdefault(f"{_service}_BURST", "1000000")
+    os.environ.setdefault(f"{_service}_MAX_CONCURRENCY", "64")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import http_clients
+
+from .synthetic_upstream import SyntheticUpstream
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+
+def _analyze(client: TestClient, wallet: str) -> dict:
+    response = client.post("/analyze", json={"wallet_address": wallet, "include_ledger": False})
+    response.raise_for_status()
+    return response.json()
+
+def _calls(upstream: SyntheticUpstream) -> str:
+    return ", ".join(f"{name}={count}" for name, count in sorted(upstream.calls.items())) or "none"
+
+def _rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run(n_swaps: int) -> dict:
+    wallet = f"Bench{n_swaps:07d}Wa11et"
+    upstream = SyntheticUpstream(wallet, n_swaps)
+    http_clients.use_transport(upstream.transport())
+    try:
+        with TestClient(app) as client:
+            baseline = _rss_mib()
+            start = time.perf_counter()
+            result = _analyze(client, wallet)
+            cold = time.perf_counter() - start
+            peak = _rss_mib()
+            cold_calls = _calls(upstream)
+
+            upstream.calls.clear()
+            start = time.perf_counter()
+            _analyze(client, wallet)
+            warm = time.perf_counter() - start
+            warm_calls = _calls(upstream)
+    finally:
+        http_clients.use_transport(None)
+
+    return {
+        "swaps": n_swaps,
+        "trades": result["debug"]["total_trades"],
+        "cold_s": cold,
+        "warm_s": warm,
+        "baseline_mib": baseline,
+        "peak_mib": peak,
+        "cold_calls": cold_calls,
+        "warm_calls": warm_calls,
+    }
+
+def _run_isolated(n_swaps: int) -> dict:
+    """Runs one size in a child process and returns its result row."""
+    child = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_analyze", "--one", str(n_swaps)],
+        stdout=subprocess.PIPE, check=True, text=True,
+    )
+    return json.loads(child.stdout.splitlines()[-1])
+
+def main():
+    if sys.argv[1:2] == ["--one"]:
+        print(json.dumps(run(int(sys.argv[2]))))
+        return
+
+    for n in [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES:
+        row = _run_isolated(n)
+        print(
+            f"{row['swaps']:>7} swaps ({row['trades']} trades): cold {row['cold_s']:8.2f}s  "
+            f"warm {row['warm_s']:6.2f}s  peak RSS {row['peak_mib']:7.1f} MiB "
+            f"(+{row['peak_mib'] - row['baseline_mib']:.1f} over idle app)"
+        )
+        print(f"{'':>8}cold calls: {row['cold_calls']}")
+        print(f"{'':>8}warm calls: {row['warm_calls']}")
+
+if __name__ == "__main__":
+    main()
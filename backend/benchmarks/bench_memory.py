@@ -0,0 +1,73 @@
+"""
+Compares the memory held per analysis by the previous representations (a
+`__dict__`-backed Swap dataclass and a list of 10-key ledger dicts) with the
+slotted Swap plus the column-backed TradeLedger.
+
+    cd backend && python -m benchmarks.bench_memory [n_swaps]
+"""
+import random
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from app.services.ledger import MintTable, TradeLedger
+from app.services.transaction_parser import Swap
+
+@dataclass
+class LegacySwap:
+    signature: str
+    timestamp: int
+    from_token: str
+    to_token: str
+    from_amount: float
+    to_amount: float
+
+def _mint(i: int) -> str:
+    # A fresh string per swap, as decoded from JSON
+    return "".join(["Mint", f"{i:040d}"])
+
+def synthetic(n: int, seed: int = 11):
+    rng = random.Random(seed)
+    for i in range(n):
+        a, b = rng.sample(range(20), 2)
+        yield (f"sig{i:084d}", 1_700_000_000 + i, _mint(a), _mint(b), rng.uniform(1, 100),
+               rng.uniform(1, 100), rng.uniform(0.1, 10), rng.uniform(0.1, 10))
+
+def legacy(n: int):
+    swaps, ledger = [], []
+    for sig, ts, a, b, fa, ta, fp, tp in synthetic(n):
+        swaps.append(LegacySwap(sig, ts, a, b, fa, ta))
+        ledger.append({
+            "timestamp": ts, "type": "SWAP", "from_token": a, "to_token": b,
+            "from_amount": fa, "to_amount": ta, "from_price": fp, "to_price": tp,
+            "profit_or_loss": ta * tp - fa * fp, "price_after_60s": tp,
+        })
+    return swaps, ledger
+
+def compact(n: int):
+    mints = MintTable()
+    swaps, ledger = [], TradeLedger(mints)
+    for sig, ts, a, b, fa, ta, fp, tp in synthetic(n):
+        a, b = mints.mints[mints.intern(a)], mints.mints[mints.intern(b)]
+        swaps.append(Swap(sig, ts, a, b, fa, ta))
+        ledger.append(sig, ts, a, b, fa, ta, fp, tp, ta * tp - fa * fp)
+    return swaps, ledger
+
+def measure(build, n: int) -> int:
+    tracemalloc.start()
+    result = build(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+def main(n: int):
+    before = measure(legacy, n)
+    after = measure(compact, n)
+    print(f"{n} swaps")
+    print(f"  dataclass + dict ledger:      {before / 2**20:8.1f} MiB")
+    print(f"  slotted Swap + TradeLedger:   {after / 2**20:8.1f} MiB")
+    print(f"  reduction:                    {before / after:8.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
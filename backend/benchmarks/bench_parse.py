@@ -0,0 +1,82 @@
+"""
+Measures event-loop responsiveness while a large batch of enhanced transactions
+is parsed, inline versus through parse_pool.
+
+A ticker coroutine sleeps 5 ms in a loop and records how late it wakes up; with
+inline parsing the loop is blocked for the whole parse, with the pool the lag
+should stay close to zero.
+
+    cd backend && python -m benchmarks.bench_parse [n_transactions]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from app import config
+from app.services import parse_pool
+
+WALLET = "BenchWa11et1111111111111111111111111111111"
+
+def synthetic_transactions(n: int, seed: int = 3) -> list[dict]:
+    rng = random.Random(seed)
+    mints = [f"Mint{i:040d}" for i in range(50)]
+    txs = []
+    for i in range(n):
+        from_mint, to_mint = rng.sample(mints, 2)
+        transfers = [
+            {"mint": from_mint, "tokenAmount": rng.uniform(1, 1000), "decimals": 0,
+             "fromUserAccount": WALLET, "toUserAccount": "pool"},
+            {"mint": to_mint, "tokenAmount": rng.uniform(1, 1000), "decimals": 0,
+             "fromUserAccount": "pool", "toUserAccount": WALLET},
+        ]
+        # Unrelated transfers inside the same transaction, as in real DEX routes
+        for _ in range(rng.randint(2, 12)):
+            transfers.append({"mint": rng.choice(mints), "tokenAmount": rng.uniform(1, 1000),
+                              "decimals": 6, "fromUserAccount": "a", "toUserAccount": "b"})
+        txs.append({"signature": f"sig{i}", "timestamp": 1_700_000_000 + i, "tokenTransfers": transfers})
+    return txs
+
+async def _measure(parse, txs):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    swaps = await parse(txs)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return swaps, elapsed, max(lags)
+
+async def main(n: int):
+    txs = synthetic_transactions(n)
+
+    async def inline(batch):
+        return parse_pool.parse_chunk(batch, WALLET)
+
+    async def pooled(batch):
+        return await parse_pool.parse_transactions(batch, WALLET)
+
+    # Warm the pool up so process start-up isn't counted
+    config.PARSE_POOL_THRESHOLD = 1
+    await pooled(txs[:10])
+
+    inline_swaps, inline_s, inline_lag = await _measure(inline, txs)
+    pooled_swaps, pooled_s, pooled_lag = await _measure(pooled, txs)
+    assert inline_swaps == pooled_swaps
+
+    print(f"{n} transactions, {len(inline_swaps)} swaps")
+    print(f"  inline: {inline_s * 1000:8.1f} ms total, max loop lag {inline_lag * 1000:8.1f} ms")
+    print(f"  pooled: {pooled_s * 1000:8.1f} ms total, max loop lag {pooled_lag * 1000:8.1f} ms")
+    parse_pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000))
@@ -0,0 +1,136 @@
+"""
+Compares the per-trade Python loop that used to compute the window totals and the
+chart in analyze_wallet with the rollup queries in pnl_rollups, over a ledger
+saved to a throwaway wallet store.
+
+    cd backend && python -m benchmarks.bench_pnl [n_swaps]
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Offline settings; must be in place before the app reads its config
+os.environ.setdefault("UPSTREAM_MODE", "replay")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="wallet-analyzer-bench-"))
+
+from app.services import pnl_columns, pnl_rollups, wallet_store
+from app.services.ledger import TradeLedger
+from app.services.pnl_engine import PnlSnapshot
+
+WALLET = "Bench111111111111111111111111111111111111111"
+
+def synthetic_ledger(n: int, now_ts: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    mints = [f"Mint{i:040d}" for i in range(20)]
+    ledger = []
+    for _ in range(n):
+        from_token, to_token = rng.sample(mints, 2)
+        from_amount, to_amount = rng.uniform(1, 100), rng.uniform(1, 100)
+        from_price, to_price = rng.uniform(0.1, 10), rng.uniform(0.1, 10)
+        ledger.append({
+            "timestamp": now_ts - rng.randint(0, 365 * 86400),
+            "type": "SWAP",
+            "from_token": from_token,
+            "to_token": to_token,
+            "from_amount": from_amount,
+            "to_amount": to_amount,
+            "from_price": from_price,
+            "to_price": to_price,
+            "profit_or_loss": to_amount * to_price - from_amount * from_price,
+        })
+    return ledger
+
+def legacy_summary(trade_ledger: list[dict], now_utc: datetime, unrealized_pnl: float):
+    """The loop-based implementation previously inlined in analyze_wallet."""
+    trade_ledger = sorted(trade_ledger, key=lambda x: x["timestamp"])
+
+    def in_time_window(timestamp, days):
+        try:
+            if timestamp <= 0:
+                return False
+            trade_time = datetime.utcfromtimestamp(timestamp)
+            cutoff_time = now_utc - timedelta(days=days)
+            return trade_time >= cutoff_time
+        except (ValueError, OSError):
+            return False
+
+    pnl_summary = {}
+    for label, days in pnl_columns.WINDOWS_DAYS.items():
+        pnl_summary[label] = {
+            "realized": sum(t["profit_or_loss"] for t in trade_ledger if in_time_window(t["timestamp"], days)),
+            "unrealized": unrealized_pnl if any(in_time_window(t["timestamp"], days) for t in trade_ledger) else 0,
+        }
+    pnl_summary["all_time"] = {"realized": sum(t["profit_or_loss"] for t in trade_ledger), "unrealized": unrealized_pnl}
+
+    chart_data = []
+    cumulative_pnl = 0
+    for trade in trade_ledger:
+        cumulative_pnl += trade["profit_or_loss"]
+        try:
+            formatted_time = datetime.utcfromtimestamp(trade["timestamp"]).strftime("%Y-%m-%d %H:%M")
+        except (ValueError, OSError):
+            formatted_time = "Invalid Date"
+        chart_data.append({"date": formatted_time, "pnl": cumulative_pnl + unrealized_pnl})
+    return pnl_summary, chart_data
+
+def save_ledger(trade_ledger: list[dict]):
+    """Stores the ledger for WALLET; signatures follow time order so ties keep their order."""
+    trade_ledger = sorted(trade_ledger, key=lambda x: x["timestamp"])
+    ledger = TradeLedger()
+    for i, t in enumerate(trade_ledger):
+        ledger.append(f"sig{i:08d}", t["timestamp"], t["from_token"], t["to_token"], t["from_amount"],
+                      t["to_amount"], t["from_price"], t["to_price"], t["profit_or_loss"])
+    snapshot = PnlSnapshot(WALLET, last_timestamp=trade_ledger[-1]["timestamp"],
+                           last_signature=f"sig{len(trade_ledger) - 1:08d}", swap_count=len(trade_ledger))
+    wallet_store.save_pnl_snapshot(snapshot, ledger, reset=True)
+
+def _assert_close(legacy, rollups):
+    (legacy_summary_, legacy_chart), (summary, chart) = legacy, rollups
+    for label, values in legacy_summary_.items():
+        for key, value in values.items():
+            assert math.isclose(value, summary[label][key], rel_tol=1e-9, abs_tol=1e-6), (label, key)
+    assert len(legacy_chart) == len(chart)
+    for old, new in zip(legacy_chart, chart):
+        assert old["date"] == new["date"]
+        assert math.isclose(old["pnl"], new["pnl"], rel_tol=1e-9, abs_tol=1e-6)
+
+def main(n: int):
+    now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+    now_ts = now_utc.replace(tzinfo=timezone.utc).timestamp()
+    ledger = synthetic_ledger(n, int(now_ts))
+    unrealized = 1234.5
+
+    start = time.perf_counter()
+    legacy = legacy_summary(ledger, now_utc, unrealized)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_ledger(ledger)
+    save_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    totals = pnl_rollups.window_totals(WALLET, now_ts, unrealized)
+    totals_s = time.perf_counter() - start
+    start = time.perf_counter()
+    # Every trade, as the legacy chart plotted them
+    chart = pnl_rollups.chart(WALLET, unrealized, resolution="trade", max_points=n)
+    chart_s = time.perf_counter() - start
+    start = time.perf_counter()
+    pnl_rollups.chart(WALLET, unrealized)
+    auto_chart_s = time.perf_counter() - start
+
+    _assert_close(legacy, (totals, chart))
+    print(f"{n} swaps")
+    print(f"  legacy loop:          {legacy_s * 1000:8.1f} ms")
+    print(f"  ledger save:          {save_s * 1000:8.1f} ms")
+    print(f"  rollup window totals: {totals_s * 1000:8.1f} ms")
+    print(f"  per-trade chart:      {chart_s * 1000:8.1f} ms")
+    print(f"  auto chart:           {auto_chart_s * 1000:8.1f} ms")
+    print(f"  speedup (totals + per-trade chart): {legacy_s / (totals_s + chart_s):8.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,77 @@
+"""
+In-process stand-in for Helius and Birdeye serving a synthetic wallet, for the
+benchmarks. Install it with `http_clients.use_transport(upstream.transport())`;
+every request is answered locally and counted per endpoint in `upstream.calls`.
+"""
+import random
+import time
+import zlib
+from collections import Counter
+
+import httpx
+
+class SyntheticUpstream:
+    def __init__(self, wallet: str, n_swaps: int, n_mints: int = 50, span_days: int = 120, seed: int = 7):
+        rng = random.Random(seed)
+        # Mints are namespaced by wallet so wallets never share cached prices
+        mints = [f"{wallet[:8]}Mint{i:032d}" for i in range(n_mints)]
+        now = int(time.time())
+        step = max(span_days * 86400 // max(n_swaps, 1), 1)
+        self.wallet = wallet
+        self.calls = Counter()
+        # Newest first, as Helius pages them
+        self.transactions = []
+        for i in range(n_swaps):
+            from_mint, to_mint = rng.sample(mints, 2)
+            self.transactions.append({
+                "signature": f"{wallet[:8]}sig{i:010d}",
+                "timestamp": now - 120 - i * step,
+                "tokenTransfers": [
+                    {"mint": from_mint, "tokenAmount": rng.uniform(1, 1000),
+                     "fromUserAccount": wallet, "toUserAccount": "pool"},
+                    {"mint": to_mint, "tokenAmount": rng.uniform(1, 1000),
+                     "fromUserAccount": "pool", "toUserAccount": wallet},
+                ],
+            })
+        self._index = {tx["signature"]: i for i, tx in enumerate(self.transactions)}
+
+    @staticmethod
+    def price(mint: str, timestamp: int) -> float:
+        return zlib.crc32(mint.encode()) % 100 + 1 + (timestamp // 60) % 7 * 0.1
+
+    def _helius(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        limit = int(params.get("limit", 100))
+        start = self._index[params["before"]] + 1 if "before" in params else 0
+        until = params.get("until")
+        page = []
+        for tx in self.transactions[start:]:
+            if tx["signature"] == until or len(page) >= limit:
+                break
+            page.append(tx)
+        return httpx.Response(200, json=page)
+
+    def _birdeye(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        path = request.url.path
+        if path.endswith("/history_price"):
+            time_from, time_to = int(params["time_from"]), int(params["time_to"])
+            items = [
+                {"unixTime": t, "value": self.price(params["address"], t)}
+                for t in range((time_from + 59) // 60 * 60, time_to + 1, 60)
+            ][:1000]
+            return httpx.Response(200, json={"success": True, "data": {"items": items}})
+        now = int(time.time())
+        if path.endswith("/multi_price"):
+            data = {a: {"value": self.price(a, now)} for a in params["list_address"].split(",")}
+            return httpx.Response(200, json={"success": True, "data": data})
+        return httpx.Response(200, json={"success": True, "data": {"value": self.price(params["address"], now)}})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        service = "helius" if "helius" in request.url.host else "birdeye"
+        endpoint = request.url.path.rstrip("/").rsplit("/", 1)[-1] or "rpc"
+        self.calls[f"{service} {endpoint}"] += 1
+        return self._helius(request) if service == "helius" else self._birdeye(request)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
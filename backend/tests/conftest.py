@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+# Offline settings; must be in place before the app reads its config
+_DATA_DIR = tempfile.mkdtemp(prefix="wallet-analyzer-tests-")
+os.environ.update({
+    "UPSTREAM_MODE": "replay",
+    "DATA_DIR": _DATA_DIR,
+    "FIXTURES_DIR": os.path.join(_DATA_DIR, "fixtures"),
+    "LOG_LEVEL": "WARNING",
+    "WARMUP_ENABLED": "false",
+    "HTTP2_ENABLED": "false",
+})
+
+import httpx
+import pytest
+
+from app import config
+from app.services import (
+    current_prices, helius_service, http_clients, mint_registry, price_cache, upstream_fixtures, wallet_store,
+)
+
+_STORES = (
+    (wallet_store, "WALLET_STORE_PATH"),
+    (price_cache, "PRICE_CACHE_PATH"),
+    (mint_registry, "MINT_REGISTRY_PATH"),
+)
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    """Empty SQLite stores and in-memory caches for every test."""
+    for module, setting in _STORES:
+        monkeypatch.setattr(config, setting, str(tmp_path / f"{setting.lower()}.sqlite3"))
+        monkeypatch.setattr(module, "_conn", None)
+    price_cache._lru.clear()
+    mint_registry._mints.clear()
+    current_prices._cache.clear()
+    monkeypatch.setattr(helius_service, "_working_rpc", None)
+    yield
+    for module, _ in _STORES:
+        if module._conn is not None:
+            module._conn.close()
+
+class Upstream:
+    """
+    Replay fixtures written by the test itself: only requests registered with
+    `add` are answered, anything else fails like an unreachable host.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def add(self, method: str, url: str, body, params: dict | None = None, payload=None, status: int = 200):
+        request = httpx.Request(method, url, params=params, json=payload)
+        upstream_fixtures.write_fixture(
+            self.directory, request, status, {"content-type": "application/json"}, json.dumps(body).encode()
+        )
+
+    def add_page(self, wallet: str, transactions: list[dict], before: str | None = None, until: str | None = None):
+        """An enhanced-transactions page of `wallet`, as helius_service requests it."""
+        params = {"limit": helius_service.PAGE_SIZE}
+        if until:
+            params["until"] = until
+        if before:
+            params["before"] = before
+        self.add("GET", helius_service.HELIUS_API_URL.format(address=wallet), transactions, params=params)
+
+@pytest.fixture
+def upstream(tmp_path):
+    directory = str(tmp_path / "fixtures")
+    http_clients.use_transport(upstream_fixtures.ReplayTransport(directory))
+    yield Upstream(directory)
+    http_clients.use_transport(None)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+from app import config
+from app.services import birdeye_service, current_prices
+
+MINTS = [f"Mint{i:040d}" for i in range(3)]
+
+def test_prices_come_from_one_multi_price_call(upstream):
+    upstream.add(
+        "GET", f"{birdeye_service.BIRDEYE_API_URL}/defi/multi_price",
+        {"success": True, "data": {MINTS[0]: {"value": 2.0}, MINTS[1]: None}},
+        params={"list_address": ",".join(MINTS)},
+    )
+    prices = asyncio.run(current_prices.get_current_prices(MINTS))
+    assert prices == {MINTS[0]: 2.0, MINTS[1]: None, MINTS[2]: None}
+    # Served from the cache: no fixture is needed for a second call
+    assert asyncio.run(current_prices.get_current_prices(MINTS[:1])) == {MINTS[0]: 2.0}
+
+def test_cancelled_caller_does_not_cancel_waiters(monkeypatch):
+    release = None
+    calls = 0
+
+    async def get_multi_price(mints):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {mint: 5.0 for mint in mints}
+
+    monkeypatch.setattr(birdeye_service, "get_multi_price", get_multi_price)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        owner = asyncio.create_task(current_prices.get_current_prices(MINTS))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(current_prices.get_current_prices(MINTS))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await waiter == {mint: 5.0 for mint in MINTS}
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+
+    asyncio.run(run())
+    assert calls == 1
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(config, "CURRENT_PRICE_CACHE_MAX_ENTRIES", 100)
+
+    async def get_multi_price(mints):
+        return {mint: 1.5 for mint in mints}
+
+    monkeypatch.setattr(birdeye_service, "get_multi_price", get_multi_price)
+    for start in range(0, 1000, 50):
+        asyncio.run(current_prices.get_current_prices([f"Mint{i:040d}" for i in range(start, start + 50)]))
+    assert len(current_prices._cache) == 100
+    assert f"Mint{999:040d}" in current_prices._cache
+
+def test_warmed_prices_outlast_the_warmup_interval(monkeypatch):
+    calls = 0
+
+    async def get_multi_price(mints):
+        nonlocal calls
+        calls += 1
+        return {mint: 4.0 for mint in mints}
+
+    monkeypatch.setattr(birdeye_service, "get_multi_price", get_multi_price)
+    monkeypatch.setattr(config, "CURRENT_PRICE_TTL", 60)
+    asyncio.run(current_prices.get_current_prices(MINTS, keep_for=120))
+    assert all(expires_at - time.time() > 110 for _, expires_at in current_prices._cache.values())
+
+    # A regular lookup uses the warmed entries; the next warm-up pass refreshes them
+    asyncio.run(current_prices.get_current_prices(MINTS))
+    assert calls == 1
+    asyncio.run(current_prices.get_current_prices(MINTS, keep_for=120))
+    assert calls == 2
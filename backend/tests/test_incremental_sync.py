@@ -0,0 +1,99 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app import config
+from app.services import helius_service, wallet_store
+
+WALLET = "Wa11et1111111111111111111111111111111111111"
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(helius_service, "PAGE_SIZE", 2)
+    monkeypatch.setattr(config, "HELIUS_MAX_TRANSACTIONS", 0)
+
+def _tx(i: int) -> dict:
+    """Swap number `i`; higher numbers are newer."""
+    return {
+        "signature": f"t{i}",
+        "timestamp": 1_700_000_000 + i * 60,
+        "tokenTransfers": [
+            {"mint": "MintA", "tokenAmount": 10.0, "fromUserAccount": WALLET, "toUserAccount": "pool"},
+            {"mint": "MintB", "tokenAmount": 5.0, "fromUserAccount": "pool", "toUserAccount": WALLET},
+        ],
+    }
+
+def _sync() -> list[str]:
+    swaps = asyncio.run(helius_service.get_wallet_transactions(WALLET))
+    return [swap.signature for swap in swaps]
+
+def _first_sync(upstream):
+    upstream.add_page(WALLET, [_tx(2), _tx(1)])
+    upstream.add_page(WALLET, [], before="t1")
+    assert _sync() == ["t2", "t1"]
+
+def test_sync_fetches_only_newer_transactions(upstream):
+    _first_sync(upstream)
+    upstream.add_page(WALLET, [_tx(3)], until="t2")
+    upstream.add_page(WALLET, [], until="t2", before="t3")
+    assert _sync() == ["t3", "t2", "t1"]
+    state = wallet_store.get_sync_state(WALLET)
+    assert (state.newest_signature, state.tx_count, state.gap_before) == ("t3", 3, None)
+
+def test_short_page_does_not_end_the_history(upstream):
+    upstream.add_page(WALLET, [_tx(5)])
+    upstream.add_page(WALLET, [_tx(4), _tx(3)], before="t5")
+    upstream.add_page(WALLET, [], before="t3")
+    assert _sync() == ["t5", "t4", "t3"]
+    assert wallet_store.get_sync_state(WALLET).history_complete
+
+def test_new_transactions_are_fetched_at_the_cap(upstream, monkeypatch):
+    _first_sync(upstream)
+    monkeypatch.setattr(config, "HELIUS_MAX_TRANSACTIONS", 2)
+
+    # Six new transactions: the newest two, then two from the gap below them
+    upstream.add_page(WALLET, [_tx(8), _tx(7)], until="t2")
+    upstream.add_page(WALLET, [_tx(6), _tx(5)], until="t2", before="t7")
+    assert _sync() == ["t8", "t7", "t6", "t5", "t2", "t1"]
+    state = wallet_store.get_sync_state(WALLET)
+    assert (state.newest_signature, state.gap_before, state.gap_until) == ("t8", "t5", "t2")
+
+    # Far over the cap, the next sync still picks up what is new and keeps filling the gap
+    upstream.add_page(WALLET, [_tx(9)], until="t8")
+    upstream.add_page(WALLET, [], until="t8", before="t9")
+    upstream.add_page(WALLET, [_tx(4), _tx(3)], until="t2", before="t5")
+    assert _sync() == ["t9", "t8", "t7", "t6", "t5", "t4", "t3", "t2", "t1"]
+    assert wallet_store.get_sync_state(WALLET).gap_before == "t3"
+
+    upstream.add_page(WALLET, [], until="t9")
+    upstream.add_page(WALLET, [], until="t2", before="t3")
+    assert len(_sync()) == 9
+    state = wallet_store.get_sync_state(WALLET)
+    assert (state.newest_signature, state.gap_before, state.gap_until) == ("t9", None, None)
+
+def test_open_gap_is_widened_by_another_truncated_fetch(upstream, monkeypatch):
+    _first_sync(upstream)
+    monkeypatch.setattr(config, "HELIUS_MAX_TRANSACTIONS", 1)
+    upstream.add_page(WALLET, [_tx(6), _tx(5)], until="t2")
+    upstream.add_page(WALLET, [_tx(5), _tx(4)], until="t2", before="t6")
+    assert _sync() == ["t6", "t5", "t2", "t1"]
+
+    upstream.add_page(WALLET, [_tx(8), _tx(7)], until="t6")
+    upstream.add_page(WALLET, [_tx(7), _tx(6)], until="t2", before="t8")
+    assert _sync() == ["t8", "t7", "t6", "t5", "t2", "t1"]
+    state = wallet_store.get_sync_state(WALLET)
+    assert (state.newest_signature, state.gap_before, state.gap_until) == ("t8", "t7", "t2")
+
+def test_store_without_gap_columns_is_migrated():
+    conn = sqlite3.connect(config.WALLET_STORE_PATH)
+    conn.execute(
+        "CREATE TABLE wallets (address TEXT PRIMARY KEY, newest_signature TEXT, oldest_signature TEXT, "
+        "tx_count INTEGER NOT NULL DEFAULT 0, history_complete INTEGER NOT NULL DEFAULT 0, synced_at INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO wallets VALUES (?, 't2', 't1', 2, 1, 0)", (WALLET,))
+    conn.commit()
+    conn.close()
+
+    state = wallet_store.get_sync_state(WALLET)
+    assert (state.newest_signature, state.gap_before, state.gap_until) == ("t2", None, None)
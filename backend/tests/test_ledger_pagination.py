@@ -0,0 +1,61 @@
+import base64
+
+import orjson
+import pytest
+
+from app import responses
+from app.services import wallet_store
+from app.services.ledger import TradeLedger
+from app.services.pnl_engine import PnlSnapshot
+
+WALLET = "Wa11et1111111111111111111111111111111111111"
+
+def _store_ledger(rows: list[tuple]):
+    ledger = TradeLedger()
+    for signature, timestamp, pnl in rows:
+        ledger.append(signature, timestamp, "MintA", "MintB", 1.0, 1.0, 1.0, 1.0, pnl)
+    snapshot = PnlSnapshot(WALLET, last_timestamp=rows[-1][1], last_signature=rows[-1][0], swap_count=len(rows))
+    wallet_store.save_pnl_snapshot(snapshot, ledger)
+
+def _pages(query: wallet_store.LedgerQuery, limit: int) -> list[list[str]]:
+    pages, after = [], None
+    while True:
+        page, after = wallet_store.query_ledger(WALLET, query, limit, after)
+        pages.append(page.signatures)
+        if after is None:
+            return pages
+
+def test_pages_cover_every_row_once_in_order():
+    # Duplicate timestamps and P&L values: the signature must break ties
+    rows = [(f"sig{i:03d}", 1_700_000_000 + i // 3 * 60, float(i % 4)) for i in range(25)]
+    _store_ledger(rows)
+
+    pages = _pages(wallet_store.LedgerQuery(), limit=7)
+    assert [len(p) for p in pages] == [7, 7, 7, 4]
+    assert [s for p in pages for s in p] == [r[0] for r in rows]
+
+    by_pnl = _pages(wallet_store.LedgerQuery(sort="profit_or_loss", descending=True), limit=4)
+    expected = [r[0] for r in sorted(rows, key=lambda r: (r[2], r[0]), reverse=True)]
+    assert [s for p in by_pnl for s in p] == expected
+
+def test_filters_apply_to_every_page():
+    rows = [(f"sig{i:03d}", 1_700_000_000 + i * 60, float(i - 10)) for i in range(20)]
+    _store_ledger(rows)
+
+    query = wallet_store.LedgerQuery(start=1_700_000_000 + 5 * 60, end=1_700_000_000 + 15 * 60, min_pnl=-2)
+    pages = _pages(query, limit=3)
+    assert [s for p in pages for s in p] == [f"sig{i:03d}" for i in range(8, 15)]
+
+def test_last_page_has_no_cursor():
+    _store_ledger([("sig000", 1_700_000_000, 1.0), ("sig001", 1_700_000_060, 2.0)])
+    page, after = wallet_store.query_ledger(WALLET, wallet_store.LedgerQuery(), 2)
+    assert len(page) == 2 and after is None
+
+@pytest.mark.parametrize("key", [[{}, "sig"], [[1], "sig"], ["1", "sig"], [True, "sig"], [1, 2], [1, None]])
+def test_cursor_with_wrong_types_is_rejected(key):
+    with pytest.raises(ValueError):
+        responses.decode_cursor(base64.urlsafe_b64encode(orjson.dumps(key)).decode())
+
+def test_cursor_round_trips():
+    for key in [(1_700_000_000, "sig001"), (-2.5, "sig002")]:
+        assert responses.decode_cursor(responses.encode_cursor(key)) == key
@@ -0,0 +1,29 @@
+import sqlite3
+
+from app import config
+from app.services import mint_registry
+
+MINT = "Mint1111111111111111111111111111111111111111"
+
+def _mark_from_another_worker(until: int):
+    conn = sqlite3.connect(config.MINT_REGISTRY_PATH)
+    conn.execute("INSERT OR REPLACE INTO mints (mint, kind, no_price_until) VALUES (?, NULL, ?)", (MINT, until))
+    conn.commit()
+    conn.close()
+
+def test_marks_by_other_workers_are_seen_after_refresh(monkeypatch):
+    monkeypatch.setattr(config, "MINT_REGISTRY_REFRESH", 3600)
+    assert not mint_registry.has_no_price(MINT)
+    _mark_from_another_worker(2**40)
+    # Within the refresh interval the in-memory copy is trusted
+    assert not mint_registry.has_no_price(MINT)
+
+    monkeypatch.setattr(config, "MINT_REGISTRY_REFRESH", 0)
+    assert mint_registry.has_no_price(MINT)
+
+def test_marks_persist_and_seeds_stay_stable():
+    mint_registry.mark_no_price([MINT])
+    mint_registry._mints.clear()
+    assert mint_registry.has_no_price(MINT)
+    assert mint_registry.is_stable("EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyB7uHod")
+    assert not mint_registry.is_stable(MINT)
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.services import birdeye_service, mint_registry, price_resolver
+
+MINT = "Mint1111111111111111111111111111111111111111"
+MINUTE = 1_700_000_040
+
+def _add_history(upstream, body, status=200):
+    params = {"address": MINT, "type": "1m", "time_from": MINUTE, "time_to": MINUTE + price_resolver.MATCH_WINDOW}
+    upstream.add("GET", f"{birdeye_service.BIRDEYE_API_URL}/defi/history_price", body, params=params, status=status)
+
+def _add_current_price(upstream, body, status=200):
+    upstream.add("GET", f"{birdeye_service.BIRDEYE_API_URL}/defi/price", body, params={"address": MINT}, status=status)
+
+def _resolve() -> float:
+    prices = asyncio.run(price_resolver.resolve_prices([(MINT, MINUTE + 5)]))
+    return price_resolver.price_for(prices, MINT, MINUTE + 5)
+
+def test_candle_price_is_used(upstream):
+    _add_history(upstream, {"success": True, "data": {"items": [{"unixTime": MINUTE + 60, "value": 2.5}]}})
+    assert _resolve() == 2.5
+    assert not mint_registry.has_no_price(MINT)
+
+def test_mint_without_any_price_data_is_marked(upstream):
+    _add_history(upstream, {"success": True, "data": {"items": []}})
+    _add_current_price(upstream, {"success": True, "data": None})
+    assert _resolve() == 0
+    assert mint_registry.has_no_price(MINT)
+
+def test_failed_current_price_does_not_mark(upstream):
+    _add_history(upstream, {"success": True, "data": {"items": []}})
+    _add_current_price(upstream, {"message": "unavailable"}, status=503)
+    assert _resolve() == 0
+    assert not mint_registry.has_no_price(MINT)
+
+def test_failed_history_does_not_mark(upstream):
+    _add_history(upstream, {"message": "bad request"}, status=400)
+    _add_current_price(upstream, {"success": True, "data": None})
+    assert _resolve() == 0
+    assert not mint_registry.has_no_price(MINT)
+
+def test_reported_failure_does_not_mark(upstream):
+    _add_history(upstream, {"success": False, "message": "internal error"})
+    _add_current_price(upstream, {"success": False, "message": "internal error"})
+    assert _resolve() == 0
+    assert not mint_registry.has_no_price(MINT)
+
+def test_stablecoin_needs_no_upstream(upstream):
+    usdc = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyB7uHod"
+    prices = asyncio.run(price_resolver.resolve_prices([(usdc, MINUTE)]))
+    assert price_resolver.price_for(prices, usdc, MINUTE) == 1.0
+
+def test_fallback_prices_are_reported(upstream):
+    _add_history(upstream, {"success": True, "data": {"items": []}})
+    _add_current_price(upstream, {"success": True, "data": {"value": 3.0}})
+    for _ in range(2):
+        # Fetched from Birdeye the first time, from the price cache the second
+        fallback = set()
+        prices = asyncio.run(price_resolver.resolve_prices([(MINT, MINUTE + 5)], fallback=fallback))
+        assert price_resolver.price_for(prices, MINT, MINUTE + 5) == 3.0
+        assert fallback == {(MINT, MINUTE)}
+
+def test_candle_prices_are_not_reported_as_fallback(upstream):
+    _add_history(upstream, {"success": True, "data": {"items": [{"unixTime": MINUTE + 60, "value": 2.5}]}})
+    fallback = set()
+    asyncio.run(price_resolver.resolve_prices([(MINT, MINUTE + 5)], fallback=fallback))
+    assert fallback == set()
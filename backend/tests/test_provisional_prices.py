@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from app import analysis
+from app.services import pnl_engine, wallet_store
+from app.services.transaction_parser import Swap
+
+WALLET = "Wa11et1111111111111111111111111111111111111"
+
+def _swaps(start: int) -> list[Swap]:
+    return [
+        Swap("s1", start, "MintA", "MintB", 10.0, 5.0),
+        Swap("s2", start + 60, "MintB", "MintA", 2.0, 6.0),
+        Swap("s3", start + 120, "MintA", "MintB", 4.0, 1.5),
+    ]
+
+CANDLES = [(1.0, 2.0), (2.5, 1.0), (1.0, 2.5)]
+
+def _analyze(swaps: list[Swap], prices: list[tuple[float, float]], fallback: set[str]) -> pnl_engine.PnlSnapshot:
+    snapshot, new_swaps, reset = analysis.load_pending(WALLET, swaps, rebuild=False)
+    done = len(swaps) - len(new_swaps)
+    analysis.fold_and_save(snapshot, new_swaps, prices[done:], fallback, reset)
+    return snapshot
+
+def _price_sources() -> dict[str, str]:
+    rows = wallet_store._conn.execute("SELECT signature, price_source FROM ledger WHERE wallet = ?", (WALLET,))
+    return dict(rows.fetchall())
+
+def test_fallback_priced_swaps_are_folded_again_with_candles():
+    swaps = _swaps(int(time.time()) - 600)
+    provisional = [CANDLES[0], (9.0, 1.0), CANDLES[2]]
+    answered = _analyze(swaps, provisional, fallback={"s2"})
+
+    # The response covers every swap, but the stored snapshot stops before s2
+    assert answered.swap_count == 3
+    assert wallet_store.load_pnl_snapshot(WALLET).last_signature == "s1"
+    assert _price_sources() == {"s1": "history", "s2": "fallback", "s3": "history"}
+
+    # Candles have arrived: s2 and s3 are folded again and replace their rows
+    refolded = _analyze(swaps, CANDLES, fallback=set())
+    full = pnl_engine.PnlSnapshot(wallet=WALLET)
+    expected = pnl_engine.fold(full, swaps, CANDLES)
+
+    assert wallet_store.load_pnl_snapshot(WALLET).swap_count == 3
+    assert refolded.realized_pnl == pytest.approx(full.realized_pnl)
+    assert list(wallet_store.load_ledger(WALLET).pnl) == pytest.approx(list(expected.pnl))
+    assert _price_sources() == {"s1": "history", "s2": "history", "s3": "history"}
+    realized, trades = wallet_store.realized_between(WALLET, 0, 2**62)
+    assert (realized, trades) == (pytest.approx(sum(expected.pnl)), 3)
+
+def test_old_fallback_prices_are_final(monkeypatch):
+    swaps = _swaps(int(time.time()) - 7200)
+    monkeypatch.setattr(analysis.config, "PRICE_SETTLE_AGE", 3600)
+    _analyze(swaps, CANDLES, fallback={"s2"})
+    assert wallet_store.load_pnl_snapshot(WALLET).swap_count == 3
+    assert _price_sources()["s2"] == "fallback"
+
+def test_streamed_ledger_skips_provisional_rows():
+    swaps = _swaps(int(time.time()) - 600)
+    _analyze(swaps, CANDLES, fallback={"s2"})
+    snapshot = wallet_store.load_pnl_snapshot(WALLET)
+    query = wallet_store.LedgerQuery(through=(snapshot.last_timestamp, snapshot.last_signature))
+    assert [sig for page in wallet_store.iter_ledger(WALLET, 2, query) for sig in page.signatures] == ["s1"]
+
+def test_chunks_are_emitted_as_they_are_priced(monkeypatch):
+    swaps = _swaps(int(time.time()) - 600)
+    prices = dict(zip(("s1", "s2", "s3"), CANDLES))
+    monkeypatch.setattr(analysis, "LEDGER_CHUNK_SIZE", 1)
+
+    async def run():
+        first_emitted = asyncio.Event()
+
+        async def get_prices_for_swaps(chunk, on_progress=None, fallback=None):
+            if chunk[0].signature != "s1":
+                # Later chunks are only priced once the first one has gone out
+                await first_emitted.wait()
+            if chunk[0].signature == "s2":
+                fallback.add("s2")
+            return [prices[swap.signature] for swap in chunk]
+
+        emitted = []
+
+        def on_rows(rows):
+            emitted.append(list(rows.signatures))
+            first_emitted.set()
+
+        monkeypatch.setattr(analysis, "get_prices_for_swaps", get_prices_for_swaps)
+        snapshot, new_swaps, reset = analysis.load_pending(WALLET, swaps, rebuild=False)
+        await analysis.price_and_fold(snapshot, new_swaps, reset, on_rows=on_rows)
+        return snapshot, emitted
+
+    snapshot, emitted = asyncio.run(run())
+    assert emitted == [["s1"], ["s2"], ["s3"]]
+    assert snapshot.swap_count == 3
+    assert wallet_store.load_pnl_snapshot(WALLET).last_signature == "s1"
+    assert _price_sources() == {"s1": "history", "s2": "fallback", "s3": "history"}
@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import config
+from app.services import helius_service, http_clients, rate_limiter
+
+SIGNATURES = [f"sig{i}" for i in range(5)]
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """A fresh Helius limiter with plenty of rate, so only token accounting is observed."""
+    fresh = rate_limiter.RateLimiter("Helius", rate=1000, burst=10, max_concurrency=4)
+    monkeypatch.setattr(rate_limiter, "helius", fresh)
+    return fresh
+
+def _fetch() -> list:
+    client = http_clients.get(http_clients.HELIUS_RPC)
+    return asyncio.run(helius_service.get_parsed_transactions(client, SIGNATURES))
+
+def _batch_payload() -> list[dict]:
+    return [helius_service._get_parsed_transaction_call(sig, i) for i, sig in enumerate(SIGNATURES)]
+
+def test_batch_is_charged_per_call(upstream, limiter):
+    upstream.add("POST", config.HELIUS_RPC_URL, [{"id": i, "result": {"n": i}} for i in range(5)],
+                 payload=_batch_payload())
+    assert _fetch() == [{"n": i} for i in range(5)]
+    assert limiter._tokens == pytest.approx(5, abs=0.5)
+
+def test_failed_batch_is_not_retried_one_by_one(upstream, limiter, monkeypatch):
+    singles = []
+    monkeypatch.setattr(helius_service, "get_parsed_transaction", lambda client, sig: singles.append(sig))
+    assert _fetch() == [None] * 5
+    assert singles == []
+
+def test_endpoint_without_batches_falls_back_to_single_calls(upstream, limiter):
+    upstream.add("POST", config.HELIUS_RPC_URL, {"error": {"code": -32600, "message": "batch not supported"}},
+                 payload=_batch_payload())
+    for i, sig in enumerate(SIGNATURES):
+        upstream.add("POST", config.HELIUS_RPC_URL, {"id": "1", "result": {"n": i}},
+                     payload=helius_service._get_parsed_transaction_call(sig, "1"))
+    assert _fetch() == [{"n": i} for i in range(5)]
+
+def test_cost_above_burst_does_not_stall():
+    limiter = rate_limiter.RateLimiter("test", rate=1000, burst=2, max_concurrency=1)
+
+    async def send():
+        return httpx.Response(200)
+
+    async def run():
+        await asyncio.wait_for(limiter.request(send, cost=5), timeout=1)
+        assert limiter._tokens < 0
+        # The debt is paid off before the next request goes out
+        await asyncio.wait_for(limiter.request(send), timeout=1)
+
+    asyncio.run(run())
+
+def test_fallback_looks_up_only_the_newest_signatures(monkeypatch):
+    requested = []
+
+    async def get_parsed_transactions(client, signatures):
+        requested.extend(signatures)
+        return [None] * len(signatures)
+
+    monkeypatch.setattr(config, "HELIUS_RPC_FALLBACK_MAX", 3)
+    monkeypatch.setattr(helius_service, "get_parsed_transactions", get_parsed_transactions)
+    overviews = [{"signature": f"sig{i}"} for i in range(10)]
+    assert asyncio.run(helius_service._parse_overviews(overviews, "wallet", rpc_fallback=True)) == []
+    assert requested == ["sig0", "sig1", "sig2"]
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from app.services import price_cache, price_resolver
+from app.services.single_flight import SingleFlight
+
+MINT = "Mint1111111111111111111111111111111111111111"
+MINUTE = 1_700_000_040
+
+def test_do_shares_one_call():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*[flight.do("k", fetch) for _ in range(5)])
+        return calls, results
+
+    calls, results = asyncio.run(run())
+    assert calls == 1 and results == [42] * 5
+
+def test_do_propagates_errors_and_forgets_them():
+    async def run():
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*[flight.do("k", boom) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        async def ok():
+            return 1
+        # A failure is not remembered
+        assert await flight.do("k", ok) == 1
+
+    asyncio.run(run())
+
+def test_do_survives_a_cancelled_waiter():
+    async def run():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+
+def test_claim_fail_reaches_waiters():
+    async def run():
+        flight = SingleFlight()
+        claimed, waiting = flight.claim(["a", "b"])
+        assert claimed == ["a", "b"] and not waiting
+        _, waiting = flight.claim(["a"])
+        flight.fail("a", RuntimeError("boom"))
+        flight.resolve("b", 2)
+        with pytest.raises(RuntimeError):
+            await waiting["a"]
+        # Settled keys can be claimed again
+        assert flight.claim(["a", "b"])[0] == ["a", "b"]
+
+    asyncio.run(run())
+
+@pytest.fixture
+def slow_history(monkeypatch):
+    """Price history that answers only once `release` is set; counts its calls."""
+    state = {"calls": 0, "release": None}
+
+    async def get_price_history(token, time_from, time_to):
+        state["calls"] += 1
+        await state["release"].wait()
+        return [(MINUTE, 3.0)]
+
+    monkeypatch.setattr(price_resolver.birdeye_service, "get_price_history", get_price_history)
+    return state
+
+def test_cancelled_resolver_does_not_cancel_waiters(slow_history):
+    async def run():
+        slow_history["release"] = asyncio.Event()
+        owner = asyncio.create_task(price_resolver.resolve_prices([(MINT, MINUTE)]))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(price_resolver.resolve_prices([(MINT, MINUTE)]))
+        await asyncio.sleep(0.01)
+
+        # The analysis that claimed the key goes away (e.g. its stream client disconnected)
+        owner.cancel()
+        await asyncio.sleep(0.01)
+        slow_history["release"].set()
+
+        assert await waiter == {(MINT, MINUTE): 3.0}
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+
+    asyncio.run(run())
+    assert slow_history["calls"] == 1
+    # The detached fetch still completed and cached the price
+    assert price_cache.get(MINT, MINUTE) == 3.0
+
+def test_resolver_errors_reach_waiters(monkeypatch):
+    async def get_price_history(token, time_from, time_to):
+        await asyncio.sleep(0.02)
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(price_resolver.birdeye_service, "get_price_history", get_price_history)
+
+    async def run():
+        results = await asyncio.gather(
+            price_resolver.resolve_prices([(MINT, MINUTE)]),
+            price_resolver.resolve_prices([(MINT, MINUTE)]),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import main, warmup
+from app.services import price_cache, wallet_store
+
+@pytest.mark.parametrize("address", ["", "not-a-wallet", "0" * 44, "l" * 44, "A" * 31, "A" * 45, "A" * 43 + "/"])
+def test_watch_rejects_invalid_addresses(address):
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.watch_wallet(address))
+    assert excinfo.value.status_code == 400
+    assert wallet_store.load_watchlist() == []
+
+def test_watch_accepts_wallet_address():
+    address = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+    assert asyncio.run(main.watch_wallet(address)) == {"wallet_address": address, "added": True}
+    assert [wallet.address for wallet in wallet_store.load_watchlist()] == [address]
+
+def test_warmup_pass_purges_expired_prices():
+    price_cache.put("MintA", 1, 1.0, ttl=-1)
+    price_cache.put("MintB", 1, 2.0)
+    asyncio.run(warmup.scheduler.warm_all())
+    rows = price_cache._connection().execute("SELECT mint FROM prices").fetchall()
+    assert rows == [("MintB",)]
+
+def test_batch_rejects_invalid_addresses(monkeypatch):
+    monkeypatch.setattr(main.analysis, "run_batch", pytest.fail)
+    request = main.BatchAnalysisRequest(wallet_addresses=["9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM", "not-a-wallet"])
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.analyze_wallets_batch(request, None))
+    assert excinfo.value.status_code == 400
+    assert "not-a-wallet" in excinfo.value.detail
@@ -24,14 +24,32 @@ interface AnalysisResult {
     all_time: Pnl;
   };
   chart_data: { date: string; pnl: number }[];
-  trade_ledger: any[];
 }
 
+// Events emitted line by line by the backend's /analyze/stream endpoint
+type StreamEvent =
+  | { event: 'start'; wallet_address: string }
+  | { event: 'progress'; stage: 'fetch'; pages: number; transactions: number }
+  | { event: 'progress'; stage: 'price'; resolved: number; total: number }
+  | ({ event: 'summary' } & AnalysisResult)
+  | { event: 'error'; detail: string };
+
+const describeProgress = (event: StreamEvent): string | null => {
+  if (event.event === 'progress' && event.stage === 'fetch') {
+    return `Fetched ${event.transactions} transactions (${event.pages} pages)...`;
+  }
+  if (event.event === 'progress' && event.stage === 'price') {
+    return `Resolved ${event.resolved} of ${event.total} prices...`;
+  }
+  return null;
+};
+
 export default function Home() {
   const [walletAddress, setWalletAddress] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [result, setResult] = useState<AnalysisResult | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const [progress, setProgress] = useState<string | null>(null);
 
   const handleAnalyse = async () => {
     if (!walletAddress) {
@@ -41,26 +59,59 @@ export default function Home() {
     setIsLoading(true);
     setError(null);
     setResult(null);
+    setProgress(null);
 
     try {
-      const response = await fetch('http://127.0.0.1:8000/analyze', {
+      const response = await fetch('http://127.0.0.1:8000/analyze/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ wallet_address: walletAddress }),
+        // The ledger is paged in by the Results view from /wallets/{address}/ledger
+        body: JSON.stringify({ wallet_address: walletAddress, include_ledger: false }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error('Failed to fetch analysis from the backend.');
       }
 
-      const data: AnalysisResult = await response.json();
-      setResult(data);
+      // Read the NDJSON stream, reporting progress until the summary arrives
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+
+      const handleEvent = (event: StreamEvent) => {
+        if (event.event === 'summary') {
+          const { event: _, ...summary } = event;
+          setResult(summary);
+        } else if (event.event === 'error') {
+          throw new Error(event.detail || 'Analysis failed.');
+        }
+        const message = describeProgress(event);
+        if (message) {
+          setProgress(message);
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value, { stream: !done });
+        const lines = buffered.split('\n');
+        buffered = done ? '' : lines.pop() ?? '';
+        for (const line of lines) {
+          if (line.trim()) {
+            handleEvent(JSON.parse(line));
+          }
+        }
+        if (done) {
+          break;
+        }
+      }
     } catch (err: any) {
       setError(err.message || 'An unexpected error occurred.');
     } finally {
       setIsLoading(false);
+      setProgress(null);
     }
   };
 
@@ -95,7 +146,7 @@ export default function Home() {
 
       {isLoading && !result && (
         <div className="mt-8">
-          <p className="text-lg animate-pulse">Loading analysis...</p>
+          <p className="text-lg animate-pulse">{progress ?? 'Loading analysis...'}</p>
         </div>
       )}
 
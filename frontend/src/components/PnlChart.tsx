@@ -24,7 +24,8 @@ export const PnlChart = ({ data }: PnlChartProps) => {
             labelStyle={{ color: '#E2E8F0' }}
           />
           <Legend wrapperStyle={{ color: '#E2E8F0' }} />
-          <Line type="monotone" dataKey="pnl" stroke="#38B2AC" strokeWidth={2} activeDot={{ r: 8 }} />
+          {/* The backend caps series at CHART_MAX_POINTS, so every point is drawn without per-point dots */}
+          <Line type="monotone" dataKey="pnl" stroke="#38B2AC" strokeWidth={2} dot={false} activeDot={{ r: 8 }} />
         </LineChart>
       </ResponsiveContainer>
     </div>
@@ -1,7 +1,7 @@
 'use client';
 
+import { useCallback, useEffect, useState } from 'react';
 import dynamic from 'next/dynamic';
-import Papa from 'papaparse';
 
 // Dynamically import PnlChart with SSR turned off
 const PnlChart = dynamic(() => import('./PnlChart').then((mod) => mod.PnlChart), {
@@ -23,9 +23,16 @@ interface AnalysisResult {
     all_time: Pnl;
   };
   chart_data: { date: string; pnl: number }[];
-  trade_ledger: any[];
 }
 
+interface LedgerPage {
+  trades: any[];
+  next_cursor: string | null;
+}
+
+const API_URL = 'http://127.0.0.1:8000';
+const LEDGER_PAGE_SIZE = 200;
+
 interface ResultsProps {
   result: AnalysisResult;
 }
@@ -43,22 +50,40 @@ const PnlCard = ({ title, pnl }: { title: string; pnl: Pnl }) => (
 );
 
 export const Results = ({ result }: ResultsProps) => {
-  const handleDownload = () => {
-    const csv = Papa.unparse(result.trade_ledger, {
-      columns: ["timestamp", "type", "from_token", "to_token", "price_after_60s", "profit_or_loss"]
-    });
+  const ledgerUrl = `${API_URL}/wallets/${encodeURIComponent(result.wallet_address)}/ledger`;
+  const [trades, setTrades] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingTrades, setIsLoadingTrades] = useState(false);
 
-    const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    if (link.href) {
-      URL.revokeObjectURL(link.href);
+  // Pages through the server-side ledger; a null cursor starts from the first page
+  const loadTrades = useCallback(async (cursor: string | null) => {
+    setIsLoadingTrades(true);
+    try {
+      const params = new URLSearchParams({ limit: String(LEDGER_PAGE_SIZE) });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${ledgerUrl}?${params}`);
+      if (!response.ok) {
+        throw new Error('Failed to fetch the trade ledger.');
+      }
+      const page: LedgerPage = await response.json();
+      setTrades((loaded) => (cursor ? [...loaded, ...page.trades] : page.trades));
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setIsLoadingTrades(false);
     }
-    const url = URL.createObjectURL(blob);
-    link.href = url;
-    link.setAttribute('download', `trade-ledger-${result.wallet_address}.csv`);
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
+  }, [ledgerUrl]);
+
+  useEffect(() => {
+    loadTrades(null);
+  }, [loadTrades]);
+
+  const handleDownload = () => {
+    // The CSV is generated and streamed by the backend from the stored ledger
+    window.location.href = `${ledgerUrl}?format=csv`;
   };
 
   return (
@@ -99,7 +124,7 @@ export const Results = ({ result }: ResultsProps) => {
             </tr>
           </thead>
           <tbody>
-            {result.trade_ledger.map((trade, index) => (
+            {trades.map((trade, index) => (
               <tr key={index} className="border-t border-gray-800 hover:bg-gray-700">
                 <td className="p-3 font-mono">{new Date(trade.timestamp * 1000).toLocaleString()}</td>
                 <td className="p-3">{trade.type}</td>
@@ -120,6 +145,17 @@ export const Results = ({ result }: ResultsProps) => {
           </tbody>
         </table>
       </div>
+      {nextCursor && (
+        <div className="flex justify-center mt-4">
+          <button
+            onClick={() => loadTrades(nextCursor)}
+            disabled={isLoadingTrades}
+            className="p-2 bg-gray-600 rounded-lg font-semibold hover:bg-gray-500 transition-colors disabled:opacity-50"
+          >
+            {isLoadingTrades ? 'Loading...' : 'Load more trades'}
+          </button>
+        </div>
+      )}
       <style jsx>{`
         .animate-fade-in {
           animation: fadeIn 0.5s ease-in-out;